@@ -9,7 +9,16 @@ especificamente para gerenciamento de contatos e deals (negócios).
 
 import requests
 import json
-from typing import Dict, List, Any, Optional, Union
+from urllib.parse import urlencode
+from typing import Dict, List, Any, Optional, Tuple, Union
+
+
+# Limite de subcomandos aceitos pelo método batch da API Bitrix24
+BATCH_MAX_COMMANDS = 50
+
+# Campos retornados nas buscas de deals existentes por CNPJ
+DEAL_LOOKUP_SELECT = ["ID", "TITLE", "UF_CRM_1741653424", "CONTACT_ID", "CATEGORY_ID",
+                      "UF_CRM_1748264680989", "ASSIGNED_BY_ID", "STAGE_ID"]
 
 
 class BitrixAPI:
@@ -77,6 +86,93 @@ class BitrixAPI:
         except json.JSONDecodeError:
             raise Exception("Erro ao decodificar resposta da API como JSON")
     
+    def _flatten_params(self, params: Union[Dict, List, Tuple], prefix: str = "") -> List[Tuple[str, Any]]:
+        """
+        Converte parâmetros aninhados para pares no formato de query string da API
+        (ex.: filter[CAMPO]=valor, select[0]=ID), usado nos subcomandos do batch.
+        
+        Args:
+            params (Dict | List | Tuple): Parâmetros a serem convertidos.
+            prefix (str, optional): Prefixo da chave atual na recursão.
+        
+        Returns:
+            List[Tuple[str, Any]]: Pares (chave, valor) prontos para urlencode.
+        """
+        items = params.items() if isinstance(params, dict) else enumerate(params)
+        pairs = []
+        
+        for key, value in items:
+            name = f"{prefix}[{key}]" if prefix else str(key)
+            if isinstance(value, (dict, list, tuple)):
+                pairs.extend(self._flatten_params(value, name))
+            else:
+                pairs.append((name, value))
+        
+        return pairs
+    
+    def batch(self, commands: Dict[str, Tuple[str, Optional[Dict]]], halt: bool = False) -> Dict:
+        """
+        Executa várias chamadas da API em uma única requisição HTTP (método batch).
+        
+        Args:
+            commands (Dict[str, Tuple[str, Optional[Dict]]]): Comandos indexados por chave,
+                no formato {chave: (metodo, parametros)}. Máximo de 50 comandos.
+            halt (bool, optional): Se True, interrompe o lote no primeiro erro.
+        
+        Returns:
+            Dict: Dicionário com "result" (respostas por chave) e "result_error"
+                (erros por chave).
+                
+        Raises:
+            Exception: Se houver mais comandos que o limite do batch ou a requisição falhar.
+        """
+        if len(commands) > BATCH_MAX_COMMANDS:
+            raise Exception(f"O batch aceita no máximo {BATCH_MAX_COMMANDS} comandos ({len(commands)} recebidos)")
+        
+        cmd = {}
+        for key, (method, params) in commands.items():
+            query = urlencode(self._flatten_params(params or {}))
+            cmd[key] = f"{method}?{query}" if query else method
+        
+        response = self._make_request("batch", {"halt": 1 if halt else 0, "cmd": cmd})
+        batch_result = response.get("result") or {}
+        
+        # A API devolve lista vazia (e não objeto) quando não há resultados/erros
+        return {
+            "result": batch_result.get("result") or {},
+            "result_error": batch_result.get("result_error") or {}
+        }
+    
+    def _add_and_fetch(self, entity: str, fields: Dict[str, Any]) -> Tuple[int, Dict]:
+        """
+        Cria um registro e lê seus dados em uma única requisição HTTP (batch), passando
+        o ID devolvido pelo add ao get através da referência $result[add].
+        
+        Args:
+            entity (str): Prefixo dos métodos da entidade (ex.: "crm.deal", "crm.contact").
+            fields (Dict[str, Any]): Campos do registro a ser criado.
+        
+        Returns:
+            Tuple[int, Dict]: ID do registro criado e seus dados.
+            
+        Raises:
+            Exception: Se a criação falhar ou o registro criado não for encontrado.
+        """
+        response = self.batch({
+            "add": (f"{entity}.add", {"fields": fields}),
+            "get": (f"{entity}.get", {"id": "$result[add]"})
+        }, halt=True)
+        
+        record_id = response["result"].get("add")
+        if not record_id:
+            raise Exception(f"Erro ao adicionar {entity}: {response['result_error'].get('add') or response}")
+        
+        record = response["result"].get("get")
+        if not record:
+            raise Exception(f"Registro {entity} com ID {record_id} não encontrado")
+            
+        return int(record_id), record
+    
     # ===== MÉTODOS PARA CONTATOS =====
     
     def add_contact(self, fields: Dict[str, Any]) -> int:
@@ -873,10 +969,8 @@ class BitrixAPI:
                 if not contact_fields:
                     raise Exception("Não há dados suficientes para criar um contato")
                 
-                contact_id = self.add_contact(contact_fields)
-                
-                # Busca os dados do contato criado para retornar
-                created_contact = self.get_contact_by_id(contact_id)
+                # Cria o contato e busca seus dados na mesma requisição
+                contact_id, created_contact = self._add_and_fetch("crm.contact", contact_fields)
                 
                 contact_name = created_contact.get("NAME", "Contato sem nome")
                 return {
@@ -989,8 +1083,7 @@ class BitrixAPI:
             if cnpj:
                 result = self.list_deals(
                     filter_params={"UF_CRM_1741653424": cnpj},
-                    select=["ID", "TITLE", "UF_CRM_1741653424", "CONTACT_ID", "CATEGORY_ID", 
-                           "UF_CRM_1748264680989", "ASSIGNED_BY_ID", "STAGE_ID"]
+                    select=DEAL_LOOKUP_SELECT
                 )
                 if result.get("result"):
                     deals.extend(result["result"])
@@ -1000,7 +1093,50 @@ class BitrixAPI:
         except Exception as e:
             raise Exception(f"Erro ao buscar deals pelos critérios especificados: {str(e)}")
     
-    def create_or_update_deal(self, deal_data: Dict[str, Any]) -> Dict[str, Any]:
+    def find_deals_by_cnpjs(self, cnpjs: List[str]) -> Dict[str, List[Dict]]:
+        """
+        Busca deals existentes para vários CNPJs usando o método batch, com uma
+        requisição HTTP a cada 50 CNPJs em vez de uma por CNPJ.
+        
+        Cada subcomando é a mesma consulta feita por find_deals_by_criteria, então
+        a ordem dos deals retornados por CNPJ é a mesma.
+        
+        Args:
+            cnpjs (List[str]): CNPJs a serem buscados.
+        
+        Returns:
+            Dict[str, List[Dict]]: Deals encontrados por CNPJ. CNPJs cuja busca
+                falhou dentro do lote ficam de fora do dicionário.
+        """
+        unique_cnpjs = list(dict.fromkeys(cnpj for cnpj in cnpjs if cnpj))
+        deals_by_cnpj = {}
+        
+        try:
+            for start in range(0, len(unique_cnpjs), BATCH_MAX_COMMANDS):
+                chunk = unique_cnpjs[start:start + BATCH_MAX_COMMANDS]
+                commands = {
+                    f"c{i}": ("crm.deal.list", {
+                        "start": 0,
+                        "order": {"DATE_CREATE": "DESC"},
+                        "filter": {"UF_CRM_1741653424": cnpj},
+                        "select": DEAL_LOOKUP_SELECT
+                    })
+                    for i, cnpj in enumerate(chunk)
+                }
+                
+                response = self.batch(commands)
+                for i, cnpj in enumerate(chunk):
+                    key = f"c{i}"
+                    if key in response["result"] and key not in response["result_error"]:
+                        deals_by_cnpj[cnpj] = response["result"][key] or []
+            
+            return deals_by_cnpj
+            
+        except Exception as e:
+            raise Exception(f"Erro ao buscar deals por CNPJ em lote: {str(e)}")
+    
+    def create_or_update_deal(self, deal_data: Dict[str, Any],
+                              existing_deals: Optional[List[Dict]] = None) -> Dict[str, Any]:
         """
         Cria um novo deal ou atualiza um existente baseado nos dados fornecidos.
         Realiza gestão de duplicados buscando APENAS por TITLE ou CNPJ (não por CONTACT_ID).
@@ -1019,6 +1155,8 @@ class BitrixAPI:
                     "etapa": "Contato novo",
                     "banco": "C6 - Planilha Geral"
                 }
+            existing_deals (List[Dict], optional): Deals já buscados para o CNPJ
+                (ex.: via find_deals_by_cnpjs). Se None, a busca é feita aqui.
         
         Returns:
             Dict[str, Any]: Dicionário com informações sobre a operação:
@@ -1048,9 +1186,10 @@ class BitrixAPI:
             contact_id = contact_result["contact_id"]
             
             # 2. Busca por deals existentes APENAS por CNPJ (não por contact_id)
-            existing_deals = self.find_deals_by_criteria(
-                cnpj=cnpj if cnpj else None
-            )
+            if existing_deals is None:
+                existing_deals = self.find_deals_by_criteria(
+                    cnpj=cnpj if cnpj else None
+                )
             
             # 3. Busca o ID do consultor se fornecido
             assigned_by_id = None
@@ -1152,10 +1291,8 @@ class BitrixAPI:
                 if not deal_fields.get("TITLE"):
                     raise Exception("Não há dados suficientes para criar um deal")
                 
-                deal_id = self.add_deal(deal_fields)
-                
-                # Busca os dados do deal criado para retornar
-                created_deal = self.get_deal_by_id(deal_id)
+                # Cria o deal e busca seus dados na mesma requisição
+                deal_id, created_deal = self._add_and_fetch("crm.deal", deal_fields)
                 
                 deal_title = created_deal.get("TITLE", "Deal sem título")
                 return {
@@ -9,7 +9,10 @@ de planilhas do Google Sheets usando variáveis de ambiente.
 
 import json
 import os
+import threading
 from typing import Dict, Any, Optional
+import httplib2
+import google_auth_httplib2
 from google.oauth2.service_account import Credentials
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
@@ -43,6 +46,8 @@ class GoogleSheetsAPI:
         Raises:
             ValueError: Se as credenciais não forem encontradas ou forem inválidas.
         """
+        self._local = threading.local()
+        
         if credentials_source is None:
             # Modo padrão: usar variável de ambiente
             self._init_from_env_var()
@@ -116,6 +121,7 @@ class GoogleSheetsAPI:
             GoogleSheetsAPI: Nova instância da classe.
         """
         instance = cls.__new__(cls)
+        instance._local = threading.local()
         instance.credentials = Credentials.from_service_account_info(
             credentials_dict, 
             scopes=cls.SCOPES
@@ -137,6 +143,19 @@ class GoogleSheetsAPI:
         """
         return cls(credentials_source=None)  # Usa o novo construtor padrão
     
+    def _authorized_http(self) -> google_auth_httplib2.AuthorizedHttp:
+        """
+        Retorna um cliente HTTP autorizado exclusivo da thread atual.
+        
+        O httplib2 usado pelo googleapiclient não é thread-safe; cada thread
+        precisa da sua própria instância para que abas sejam lidas em paralelo.
+        """
+        http = getattr(self._local, 'http', None)
+        if http is None:
+            http = google_auth_httplib2.AuthorizedHttp(self.credentials, http=httplib2.Http())
+            self._local.http = http
+        return http
+    
     def get_spreadsheet_info(self, spreadsheet_id: str) -> Dict[str, Any]:
         """
         Obtém informações sobre uma planilha.
@@ -150,7 +169,7 @@ class GoogleSheetsAPI:
         try:
             result = self.service.spreadsheets().get(
                 spreadsheetId=spreadsheet_id
-            ).execute()
+            ).execute(http=self._authorized_http())
             return result
         except HttpError as e:
             raise Exception(f"Erro ao acessar planilha: {str(e)}")
@@ -239,7 +258,7 @@ class GoogleSheetsAPI:
                 range=range_name,
                 valueRenderOption='FORMATTED_VALUE',
                 dateTimeRenderOption='FORMATTED_STRING'
-            ).execute()
+            ).execute(http=self._authorized_http())
             
             values = result.get('values', [])
             
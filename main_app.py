@@ -23,7 +23,7 @@ import signal
 import logging
 import threading
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from dataclasses import dataclass
 
 # Importar módulos locais
@@ -72,6 +72,9 @@ class MainApp:
         # Configurar handlers para parada graceful
         self._setup_signal_handlers()
         
+        # Início em relógio monotônico, para o tempo ativo (start_time é só para exibição)
+        self._start_counter = None
+        
         # Estatísticas da aplicação
         self.app_stats = {
             'start_time': None,
@@ -104,6 +107,26 @@ class MainApp:
         # Evitar duplicação de logs
         self.logger.propagate = False
         
+    def _log_record_samples(self, title: str, records: List[Dict], limit: int):
+        """
+        Registra em uma única mensagem de log alguns registros de exemplo.
+        
+        Args:
+            title (str): Título da lista
+            records (List[Dict]): Registros
+            limit (int): Quantidade máxima de registros exibidos
+        """
+        lines = [title]
+        for i, record in enumerate(records[:limit]):
+            nome = record.get('nome', 'N/A')
+            empresa = record.get('empresa', 'N/A')
+            banco = record.get('banco', 'N/A')
+            lines.append(f"   {i+1}. {nome} - {empresa} ({banco})")
+        if len(records) > limit:
+            lines.append(f"   ... e mais {len(records) - limit} registros")
+        
+        self.logger.info("\n".join(lines))
+        
     def _setup_signal_handlers(self):
         """Configura handlers para parada graceful."""
         def signal_handler(signum, frame):
@@ -133,9 +156,8 @@ class MainApp:
             # Executar sincronização inicial com dados das planilhas
             spreadsheet_id = os.getenv('SPREADSHEET_ID')
             
-            # Obter IDs das abas via variável de ambiente
-            sheet_ids_str = os.getenv('SHEET_IDS', '0,829477907,797561708,1064048522')
-            sheet_ids = [int(id.strip()) for id in sheet_ids_str.split(',')]
+            # IDs das abas já validados ao carregar o ambiente
+            sheet_ids = list(self.startup_module.sheet_ids)
             
             if spreadsheet_id:
                 self.logger.info("📊 Executando carga inicial de dados...")
@@ -175,9 +197,8 @@ class MainApp:
         try:
             spreadsheet_id = os.getenv('SPREADSHEET_ID')
             
-            # Obter IDs das abas via variável de ambiente
-            sheet_ids_str = os.getenv('SHEET_IDS', '0,829477907,797561708,1064048522')
-            sheet_ids = [int(id.strip()) for id in sheet_ids_str.split(',')]
+            # IDs das abas já validados ao carregar o ambiente
+            sheet_ids = list(self.startup_module.sheet_ids)
             
             if not spreadsheet_id:
                 self.logger.error("❌ SPREADSHEET_ID não configurado")
@@ -205,31 +226,17 @@ class MainApp:
                 if changes['total_new'] > 0 or changes['total_removed'] > 0:
                     self.logger.info(f"🔍 Mudanças detectadas: {changes['summary']}")
                     
-                    # Log detalhado de novos registros
+                    # Log detalhado de novos registros (apenas os primeiros 5)
                     if result.new_records:
-                        self.logger.info(f"➕ Novos registros:")
-                        for i, record in enumerate(result.new_records[:5]):  # Mostrar apenas os primeiros 5
-                            nome = record.get('nome', 'N/A')
-                            empresa = record.get('empresa', 'N/A')
-                            banco = record.get('banco', 'N/A')
-                            self.logger.info(f"   {i+1}. {nome} - {empresa} ({banco})")
-                        if len(result.new_records) > 5:
-                            self.logger.info(f"   ... e mais {len(result.new_records) - 5} registros")
+                        self._log_record_samples("➕ Novos registros:", result.new_records, 5)
                     
-                    # Log detalhado de registros removidos
+                    # Log detalhado de registros removidos (apenas os primeiros 3)
                     if result.removed_records:
-                        self.logger.info(f"🗑️ Registros removidos:")
-                        for i, record in enumerate(result.removed_records[:3]):  # Mostrar apenas os primeiros 3
-                            nome = record.get('nome', 'N/A')
-                            empresa = record.get('empresa', 'N/A')
-                            banco = record.get('banco', 'N/A')
-                            self.logger.info(f"   {i+1}. {nome} - {empresa} ({banco})")
-                        if len(result.removed_records) > 3:
-                            self.logger.info(f"   ... e mais {len(result.removed_records) - 3} registros")
+                        self._log_record_samples("🗑️ Registros removidos:", result.removed_records, 3)
                 else:
                     self.logger.info("✔️ Nenhuma mudança detectada nos dados")
                 
-                self.logger.info(f"✅ Sincronização concluída: {result.total_inserted} registros, {result.sync_duration:.2f}s")
+                self.logger.info(f"✅ Sincronização concluída: {result.total_processed} registros, {result.sync_duration:.2f}s")
                 return True
                 
         except Exception as e:
@@ -290,6 +297,7 @@ class MainApp:
         # 2. Marcar como executando
         self.is_running = True
         self.app_stats['start_time'] = datetime.now()
+        self._start_counter = time.perf_counter()
         
         # 3. Verificar se deve executar sincronização contínua
         if not self.config.enable_continuous_sync:
@@ -330,8 +338,8 @@ class MainApp:
             Dict: Estatísticas detalhadas
         """
         uptime = None
-        if self.app_stats['start_time']:
-            uptime = (datetime.now() - self.app_stats['start_time']).total_seconds()
+        if self._start_counter is not None:
+            uptime = time.perf_counter() - self._start_counter
         
         stats = {
             'application': {
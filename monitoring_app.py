@@ -224,8 +224,7 @@ class DatabaseMonitor:
                     LIMIT %s;
                 """, (limit,))
                 
-                records = cursor.fetchall()
-                result = [dict(record) for record in records]
+                result = cursor.fetchall()
                 return convert_datetime_fields(result)
         except Exception as e:
             logging.error(f"Erro ao obter processamentos Bitrix recentes: {str(e)}")
@@ -249,7 +248,7 @@ class DatabaseMonitor:
                     ORDER BY count DESC;
                 """, (cutoff_time,))
                 
-                result = [dict(record) for record in cursor.fetchall()]
+                result = cursor.fetchall()
                 return convert_datetime_fields(result)
         except Exception as e:
             logging.error(f"Erro ao obter dados por status: {str(e)}")
@@ -270,7 +269,7 @@ class DatabaseMonitor:
                     LIMIT %s;
                 """, (limit,))
                 
-                result = [dict(record) for record in cursor.fetchall()]
+                result = cursor.fetchall()
                 return convert_datetime_fields(result)
         except Exception as e:
             logging.error(f"Erro ao obter erros Bitrix: {str(e)}")
@@ -8,18 +8,283 @@ Este módulo gerencia a conexão com o banco e cria/atualiza a estrutura de tabe
 
 import os
 import sys
+import csv
 import logging
-import psycopg2
+import io
+import queue
+import atexit
+import threading
+import xxhash
+from operator import itemgetter
+from itertools import islice
+from contextlib import contextmanager
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from psycopg2.extras import RealDictCursor, execute_values, Json
+from psycopg2.pool import ThreadedConnectionPool
+from logging.handlers import QueueHandler, QueueListener
 from psycopg2 import sql
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Iterable, Iterator, Callable
 from dotenv import load_dotenv
-from datetime import datetime
+from datetime import datetime, date
+from calendar import monthrange
 
 # Importar módulos locais
 from google_sheets_api import GoogleSheetsAPI
 from bitrix_api import BitrixAPI
 
+log = logging.getLogger(__name__)
+
+# Thread que escreve os logs no stdout (iniciada uma única vez por processo)
+_log_listener: Optional[QueueListener] = None
+
+# Quantidade de exemplos de datas inválidas mostrados no aviso resumido de cada aba
+INVALID_DATE_SAMPLES = 5
+
+# Colunas de leads_data preenchidas a partir das planilhas (ordem das tuplas de inserção)
+LEADS_DATA_COLUMNS = ('data', 'cnpj', 'telefone', 'nome', 'empresa',
+                      'consultor', 'forma_prospeccao', 'etapa', 'banco')
+
+# Colunas gravadas em cada carga: as da planilha mais os hashes da linha (ver leads_load_row)
+LEADS_DATA_LOAD_COLUMNS = LEADS_DATA_COLUMNS + ('content_hash', 'change_hash')
+
+COPY_LEADS_DATA_SQL = f"COPY leads_data ({', '.join(LEADS_DATA_LOAD_COLUMNS)}) FROM STDIN WITH (FORMAT csv)"
+
+# Colunas de bitrix_processing_log gravadas em lote ao final de cada sessão
+BITRIX_PROCESSING_LOG_COLUMNS = LEADS_DATA_COLUMNS + (
+    'status', 'action_type', 'deal_id', 'contact_id',
+    'error_message', 'processing_details', 'sync_session_id'
+)
+
+# Cabeçalhos aceitos na planilha para cada coluna de leads_data (exceto "banco", que é a aba)
+SHEET_FIELD_ALIASES = (
+    ('Data', 'data'),
+    ('CNPJ', 'cnpj'),
+    ('TELEFONE', 'telefone'),
+    ('NOME', 'nome'),
+    ('EMPRESA', 'empresa'),
+    ('CONSULTOR', 'consultor'),
+    ('Forma Prospecção', 'forma_prospeccao'),
+    ('Etapa', 'etapa'),
+)
+
+# Abas sincronizadas quando SHEET_IDS não está definida
+DEFAULT_SHEET_IDS = '0,829477907,797561708,1064048522'
+
+# Índices secundários de leads_data (recriados após cargas em massa)
+LEADS_DATA_INDEXES = {
+    'idx_leads_cnpj': "CREATE INDEX IF NOT EXISTS idx_leads_cnpj ON leads_data(cnpj);",
+    'idx_leads_telefone': "CREATE INDEX IF NOT EXISTS idx_leads_telefone ON leads_data(telefone);",
+    # Parcial e com as colunas da agregação por consultor, para permitir index-only scan
+    'idx_leads_consultor': (
+        "CREATE INDEX IF NOT EXISTS idx_leads_consultor ON leads_data(consultor) "
+        "INCLUDE (banco, created_at) WHERE consultor IS NOT NULL AND consultor <> '';"
+    ),
+    'idx_leads_banco': "CREATE INDEX IF NOT EXISTS idx_leads_banco ON leads_data(banco);",
+    'idx_leads_data': "CREATE INDEX IF NOT EXISTS idx_leads_data ON leads_data(data);",
+    'idx_leads_content_hash': "CREATE INDEX IF NOT EXISTS idx_leads_content_hash ON leads_data(content_hash);",
+    'idx_leads_change_hash': "CREATE INDEX IF NOT EXISTS idx_leads_change_hash ON leads_data(change_hash);",
+}
+
+STATS_THREAD_JOIN_TIMEOUT_SECONDS = 60
+
+# Consulta das estatísticas do startup (texto fixo, sem interpolação a cada execução)
+BANK_STATS_SQL = "SELECT banco, COUNT(*) as count FROM leads_data GROUP BY banco ORDER BY count DESC;"
+
+# Limites do pool de conexões com o PostgreSQL
+DB_POOL_MIN_CONNECTIONS = 1
+DB_POOL_MAX_CONNECTIONS = 8
+
+# Linhas serializadas por vez no fluxo do COPY e bytes lidos pelo psycopg2 a cada chamada
+COPY_CHUNK_ROWS = 10000
+COPY_READ_SIZE = 64 * 1024
+
+# Datas distintas lembradas por parse_sheet_date (as planilhas repetem poucas datas em muitas linhas)
+PARSED_DATE_CACHE_SIZE = 8192
+
+
+def load_bank_stats(connection) -> tuple:
+    """
+    Obtém o total de registros de leads_data e a contagem por aba (banco).
+    
+    Args:
+        connection: Conexão psycopg2 com RealDictCursor
+        
+    Returns:
+        tuple: (total_records, [(banco, count), ...]) ordenado por contagem
+    """
+    # Cursor nomeado (lado servidor): linhas chegam em lotes de itersize.
+    # WITH HOLD é necessário porque a conexão opera em autocommit.
+    with connection.cursor(name='bank_stats_cur', withhold=True) as cursor:
+        cursor.itersize = 500
+        # Total derivado das contagens por aba (uma única varredura da tabela)
+        cursor.execute(BANK_STATS_SQL)
+        
+        total_records = 0
+        bank_stats = []
+        for stat in cursor:
+            total_records += stat['count']
+            bank_stats.append((stat['banco'], stat['count']))
+    
+    return total_records, bank_stats
+
+
+@lru_cache(maxsize=PARSED_DATE_CACHE_SIZE)
+def parse_sheet_date(value: Any) -> Optional[date]:
+    """
+    Converte uma data da planilha (dd/mm/aaaa) sem lançar exceções.
+    
+    Memorizada: cada texto de data distinto é validado uma única vez, e as demais
+    linhas com a mesma data custam uma consulta ao cache.
+    
+    Args:
+        value (Any): Valor da célula
+        
+    Returns:
+        Optional[date]: Data convertida ou None se vazia/inválida
+    """
+    if not value or not isinstance(value, str):
+        return None
+    
+    # Formato fixo: validação e conversão por fatias, sem a maquinaria de regex do strptime.
+    # Aceita o mesmo que '%d/%m/%Y': dia e mês com 1 ou 2 dígitos, ano com 4.
+    parts = value.strip().split('/')
+    if len(parts) != 3:
+        return None
+    day_text, month_text, year_text = parts
+    if not (0 < len(day_text) <= 2 and 0 < len(month_text) <= 2 and len(year_text) == 4
+            and (day_text + month_text + year_text).isascii()
+            and (day_text + month_text + year_text).isdigit()):
+        return None
+    
+    day, month, year = int(day_text), int(month_text), int(year_text)
+    if year < 1 or not 1 <= month <= 12 or not 1 <= day <= monthrange(year, month)[1]:
+        return None
+    return date(year, month, day)
+
+
+def leads_row_hash(row: Iterable[Any]) -> int:
+    """
+    Calcula o hash exato (sem normalização) de uma linha de leads_data.
+    
+    Gravado em leads_data.content_hash para que a sincronização aplique apenas a
+    diferença entre planilhas e banco. O xxh3-64 é lido como inteiro com sinal,
+    que é o intervalo de BIGINT.
+    
+    Args:
+        row (Iterable[Any]): Valores na ordem de LEADS_DATA_COLUMNS
+        
+    Returns:
+        int: Hash da linha
+    """
+    data_bytes = '\x1f'.join('' if value is None else str(value) for value in row).encode('utf-8')
+    return int.from_bytes(xxhash.xxh3_64_digest(data_bytes), 'big', signed=True)
+
+
+def leads_change_hash(row: Iterable[Any]) -> int:
+    """
+    Calcula o hash normalizado (sem espaços nas pontas, em minúsculas) de uma linha de leads_data.
+    
+    Usado na detecção de mudanças entre sincronizações, em que diferenças só de
+    espaços ou de maiúsculas/minúsculas não contam como registro novo. Gravado em
+    leads_data.change_hash para que o snapshot do banco não precise ler as linhas.
+    
+    Args:
+        row (Iterable[Any]): Valores na ordem de LEADS_DATA_COLUMNS
+        
+    Returns:
+        int: Hash da linha
+    """
+    # lower() e encode() uma única vez sobre a linha inteira, não por campo
+    data_string = '|'.join(str(value).strip() if value is not None else '' for value in row)
+    return int.from_bytes(xxhash.xxh3_64_digest(data_string.lower().encode('utf-8')), 'big', signed=True)
+
+
+def leads_load_row(row: tuple) -> tuple:
+    """
+    Acrescenta a uma linha de leads_data os hashes gravados com ela.
+    
+    Args:
+        row (tuple): Valores na ordem de LEADS_DATA_COLUMNS
+        
+    Returns:
+        tuple: Valores na ordem de LEADS_DATA_LOAD_COLUMNS
+    """
+    return (*row, leads_row_hash(row), leads_change_hash(row))
+
+
+def sheet_row_getter(rows_data: List[Dict]) -> Callable[[Dict], tuple]:
+    """
+    Resolve uma única vez, por aba, qual cabeçalho atende cada campo de SHEET_FIELD_ALIASES.
+    
+    Todas as linhas de uma aba têm as mesmas chaves (os cabeçalhos), então a
+    resolução feita na primeira linha vale para todas e evita dois .get() por
+    campo em cada linha.
+    
+    Args:
+        rows_data (List[Dict]): Linhas da aba como retornadas pelo Google Sheets
+        
+    Returns:
+        Callable[[Dict], tuple]: Função que extrai os 8 campos de uma linha, na ordem
+            de SHEET_FIELD_ALIASES ('' para campos sem cabeçalho)
+    """
+    headers = rows_data[0].keys() if rows_data else ()
+    keys = [next((alias for alias in aliases if alias in headers), None)
+            for aliases in SHEET_FIELD_ALIASES]
+    
+    if None not in keys:
+        return itemgetter(*keys)
+    return lambda row: tuple(row.get(key, '') for key in keys)
+
+
+class CopyRowStream:
+    """
+    Arquivo somente leitura que serializa linhas de leads_data em CSV sob demanda.
+    
+    Entregue ao copy_expert, faz o COPY consumir as linhas à medida que são
+    geradas, em blocos de COPY_CHUNK_ROWS, sem montar o CSV inteiro antes do envio.
+    Os hashes de cada linha (leads_load_row) são acrescentados aqui, a menos que
+    as linhas já venham com eles (hashed=True).
+    
+    Attributes:
+        count (int): Linhas serializadas até o momento
+    """
+    
+    def __init__(self, rows: Iterable[tuple], chunk_rows: int = COPY_CHUNK_ROWS, hashed: bool = False):
+        self._rows = iter(rows) if hashed else map(leads_load_row, rows)
+        self._chunk_rows = chunk_rows
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer)
+        self._pending = ''
+        self._offset = 0
+        self.count = 0
+    
+    def _next_chunk(self) -> str:
+        for row in islice(self._rows, self._chunk_rows):
+            # None vira campo vazio sem aspas, interpretado como NULL pelo COPY CSV
+            self._writer.writerow(row)
+            self.count += 1
+        
+        chunk = self._buffer.getvalue()
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return chunk
+    
+    def read(self, size: int = -1) -> str:
+        # Bloco atual consumido por deslocamento, sem recortar a string restante a cada leitura
+        if self._offset >= len(self._pending):
+            self._pending = self._next_chunk()
+            self._offset = 0
+        
+        if size is None or size < 0:
+            data = self._pending[self._offset:] + ''.join(iter(self._next_chunk, ''))
+            self._pending, self._offset = '', 0
+            return data
+        
+        data = self._pending[self._offset:self._offset + size]
+        self._offset += len(data)
+        return data
+
 
 class StartupModule:
     """
@@ -39,10 +304,16 @@ class StartupModule:
             env_file (str): Caminho para o arquivo .env com configurações
         """
         self.env_file = env_file
+        self.sheet_ids = ()
+        self.pool = None
         self.connection = None
         self.google_sheets = None
         self.bitrix = None
         
+        # Registros de bitrix_processing_log aguardando o fim da sessão para serem gravados
+        self._pending_bitrix_logs: List[tuple] = []
+        self._pending_bitrix_logs_lock = threading.Lock()
+        
         # Configurar logging
         self._setup_logging()
         
@@ -50,14 +321,32 @@ class StartupModule:
         self._load_environment()
         
     def _setup_logging(self):
-        """Configura o sistema de logging."""
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.StreamHandler(sys.stdout)
-            ]
-        )
+        """
+        Configura o sistema de logging.
+        
+        A escrita no stdout roda numa thread própria (QueueHandler + QueueListener):
+        quem loga apenas enfileira o registro, sem esperar pela I/O.
+        """
+        global _log_listener
+        
+        if _log_listener is None and not logging.getLogger().handlers:
+            log_queue = queue.SimpleQueue()
+            
+            stream_handler = logging.StreamHandler(sys.stdout)
+            stream_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+            
+            # A formatação completa fica no handler do listener; a fila leva só a mensagem
+            queue_handler = QueueHandler(log_queue)
+            queue_handler.setFormatter(logging.Formatter('%(message)s'))
+            
+            _log_listener = QueueListener(log_queue, stream_handler)
+            _log_listener.start()
+            atexit.register(_log_listener.stop)
+            
+            logging.basicConfig(
+                level=getattr(logging, os.getenv('LOG_LEVEL', 'INFO').upper(), logging.INFO),
+                handlers=[queue_handler]
+            )
         self.logger = logging.getLogger(__name__)
         
     def _load_environment(self):
@@ -75,6 +364,16 @@ class StartupModule:
         if missing_vars:
             raise ValueError(f"Variáveis de ambiente obrigatórias não encontradas: {missing_vars}")
             
+        # IDs das abas a sincronizar (validados aqui para falhar cedo com configuração inválida)
+        sheet_ids_str = os.getenv('SHEET_IDS', DEFAULT_SHEET_IDS)
+        sheet_ids = []
+        for token in sheet_ids_str.split(','):
+            try:
+                sheet_ids.append(int(token.strip()))
+            except ValueError:
+                raise ValueError(f"SHEET_IDS contém um ID de aba inválido: '{token.strip()}'")
+        self.sheet_ids = tuple(sheet_ids)
+            
         self.logger.info("✅ Variáveis de ambiente carregadas com sucesso")
         
     def connect_database(self) -> bool:
@@ -86,26 +385,87 @@ class StartupModule:
         """
         try:
             database_url = os.getenv('DATABASE_URL')
-            self.connection = psycopg2.connect(
-                database_url,
+            self.pool = ThreadedConnectionPool(
+                DB_POOL_MIN_CONNECTIONS,
+                DB_POOL_MAX_CONNECTIONS,
+                dsn=database_url,
                 cursor_factory=RealDictCursor
             )
-            self.connection.autocommit = True
             
-            # Testar conexão
-            with self.connection.cursor() as cursor:
-                cursor.execute("SELECT version();")
-                result = cursor.fetchone()
-                # Com RealDictCursor, precisamos acessar pelo nome da coluna
-                version = result['version'] if result else "Unknown version"
+            # Conexão principal, mantida durante toda a vida do módulo
+            self.connection = self._get_conn()
+            self.logger.info("✅ Conectado ao PostgreSQL")
+            
+            # Consultar versão do servidor apenas em modo debug (evita uma ida ao banco)
+            if self.logger.isEnabledFor(logging.DEBUG):
+                with self.connection.cursor() as cursor:
+                    cursor.execute("SELECT version();")
+                    result = cursor.fetchone()
+                    # Com RealDictCursor, precisamos acessar pelo nome da coluna
+                    version = result['version'] if result else "Unknown version"
+                self.logger.debug(f"PostgreSQL: {version}")
                 
-            self.logger.info(f"✅ Conectado ao PostgreSQL: {version}")
             return True
             
         except Exception as e:
-            self.logger.error(f"❌ Erro ao conectar ao banco de dados: {str(e)}")
+            self.logger.error(f"❌ Erro ao conectar ao banco de dados: {e}")
             return False
             
+    def _get_conn(self):
+        """
+        Obtém uma conexão do pool, em modo autocommit.
+        
+        Returns:
+            connection: Conexão psycopg2 que deve ser devolvida com _put_conn
+        """
+        connection = self.pool.getconn()
+        connection.autocommit = True
+        return connection
+        
+    def _put_conn(self, connection):
+        """Devolve ao pool uma conexão obtida com _get_conn."""
+        self.pool.putconn(connection)
+        
+    @contextmanager
+    def pooled_connection(self):
+        """
+        Context manager que empresta uma conexão do pool e a devolve ao sair do bloco.
+        
+        Yields:
+            connection: Conexão psycopg2 em modo autocommit
+        """
+        connection = self._get_conn()
+        try:
+            yield connection
+        finally:
+            self._put_conn(connection)
+            
+    @contextmanager
+    def transaction(self, connection=None):
+        """
+        Executa um bloco numa transação explícita.
+        
+        As conexões (principal e do pool) operam em autocommit; aqui ele é desligado
+        durante o bloco para que todas as instruções sejam confirmadas (ou desfeitas)
+        juntas, com um único flush do WAL no COMMIT, e para que SET LOCAL valha até ele.
+        
+        Args:
+            connection: Conexão a usar (padrão: conexão principal)
+            
+        Yields:
+            cursor: Cursor aberto dentro da transação
+        """
+        connection = connection or self.connection
+        previous_autocommit = connection.autocommit
+        connection.autocommit = False
+        try:
+            # "with connection" faz COMMIT ao final ou ROLLBACK em caso de exceção
+            with connection:
+                with connection.cursor() as cursor:
+                    yield cursor
+        finally:
+            connection.autocommit = previous_autocommit
+            
     def create_tables(self) -> bool:
         """
         Cria as tabelas necessárias no banco de dados.
@@ -125,6 +485,7 @@ class StartupModule:
                 drop_and_create_sql = """
                 -- Dropar tabela existente se houver
                 DROP TABLE IF EXISTS leads_data CASCADE;
+                DROP TABLE IF EXISTS leads_data_version;
                 
                 -- Criar tabela principal de dados (sem UNIQUE constraints)
                 CREATE TABLE leads_data (
@@ -138,17 +499,12 @@ class StartupModule:
                     forma_prospeccao VARCHAR(255),
                     etapa VARCHAR(255),
                     banco VARCHAR(255),
+                    content_hash BIGINT,       -- Hash da linha (leads_row_hash) para sincronização incremental
+                    change_hash BIGINT,        -- Hash normalizado (leads_change_hash) para detecção de mudanças
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                 );
                 
-                -- Criar índices para otimizar consultas (sem UNIQUE)
-                CREATE INDEX idx_leads_cnpj ON leads_data(cnpj);
-                CREATE INDEX idx_leads_telefone ON leads_data(telefone);
-                CREATE INDEX idx_leads_consultor ON leads_data(consultor);
-                CREATE INDEX idx_leads_banco ON leads_data(banco);
-                CREATE INDEX idx_leads_data ON leads_data(data);
-                
                 -- Criar tabela de log de sincronização (se não existir)
                 CREATE TABLE IF NOT EXISTS sync_log (
                     id SERIAL PRIMARY KEY,
@@ -165,6 +521,9 @@ class StartupModule:
                     details JSONB
                 );
                 
+                -- Estatísticas por tipo e período (get_sync_statistics) via varredura de intervalo
+                CREATE INDEX IF NOT EXISTS idx_sync_log_type_started ON sync_log(sync_type, started_at);
+                
                 -- Criar tabela de log de processamento Bitrix (nova)
                 CREATE TABLE IF NOT EXISTS bitrix_processing_log (
                     id SERIAL PRIMARY KEY,
@@ -201,28 +560,55 @@ class StartupModule:
                     BEFORE UPDATE ON leads_data
                     FOR EACH ROW
                     EXECUTE FUNCTION update_updated_at_column();
+                
+                -- Versão de leads_data: renovada a cada instrução que altera a tabela
+                -- (inclusive COPY e TRUNCATE), permite saber em O(1) se ela mudou.
+                -- Os valores vêm de uma sequência que não é recriada junto com a tabela,
+                -- então uma versão nunca se repete, nem após um novo startup.
+                CREATE SEQUENCE IF NOT EXISTS leads_data_version_seq;
+                CREATE TABLE leads_data_version (
+                    version BIGINT NOT NULL
+                );
+                INSERT INTO leads_data_version (version) VALUES (nextval('leads_data_version_seq'));
+                
+                CREATE OR REPLACE FUNCTION bump_leads_data_version()
+                RETURNS TRIGGER AS $$
+                BEGIN
+                    UPDATE leads_data_version SET version = nextval('leads_data_version_seq');
+                    RETURN NULL;
+                END;
+                $$ language 'plpgsql';
+                
+                CREATE TRIGGER bump_leads_data_version
+                    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON leads_data
+                    FOR EACH STATEMENT
+                    EXECUTE FUNCTION bump_leads_data_version();
                 """
                 
                 cursor.execute(drop_and_create_sql)
-                self.logger.info("✅ Tabela leads_data recriada com sucesso (permite duplicatas)")
                 
-                # Verificar estrutura da tabela
-                cursor.execute("""
-                    SELECT column_name, data_type, is_nullable
-                    FROM information_schema.columns
-                    WHERE table_name = 'leads_data'
-                    ORDER BY ordinal_position;
-                """)
+                # Criar índices para otimizar consultas (sem UNIQUE)
+                self.create_leads_indexes(cursor)
+                self.logger.info("✅ Tabela leads_data recriada com sucesso (permite duplicatas)")
                 
-                columns = cursor.fetchall()
-                self.logger.info(f"📋 Estrutura da tabela 'leads_data': {len(columns)} colunas")
-                for col in columns:
-                    self.logger.debug(f"  - {col['column_name']}: {col['data_type']} (NULL: {col['is_nullable']})")
+                # Verificar estrutura da tabela (somente em modo debug)
+                if self.logger.isEnabledFor(logging.DEBUG):
+                    cursor.execute("""
+                        SELECT column_name, data_type, is_nullable
+                        FROM information_schema.columns
+                        WHERE table_name = 'leads_data'
+                        ORDER BY ordinal_position;
+                    """)
                     
+                    columns = cursor.fetchall()
+                    self.logger.debug(f"📋 Estrutura da tabela 'leads_data': {len(columns)} colunas")
+                    for col in columns:
+                        self.logger.debug(f"  - {col['column_name']}: {col['data_type']} (NULL: {col['is_nullable']})")
+                        
                 return True
                 
         except Exception as e:
-            self.logger.error(f"❌ Erro ao criar tabelas: {str(e)}")
+            self.logger.error(f"❌ Erro ao criar tabelas: {e}")
             return False
             
     def initialize_apis(self) -> bool:
@@ -245,7 +631,7 @@ class StartupModule:
             return True
             
         except Exception as e:
-            self.logger.error(f"❌ Erro ao inicializar APIs: {str(e)}")
+            self.logger.error(f"❌ Erro ao inicializar APIs: {e}")
             return False
             
     def test_connections(self) -> Dict[str, bool]:
@@ -257,15 +643,12 @@ class StartupModule:
         """
         results = {}
         
-        # Testar banco de dados
-        try:
-            with self.connection.cursor() as cursor:
-                cursor.execute("SELECT 1")
-                results['database'] = True
-                self.logger.info("✅ Conexão com banco de dados: OK")
-        except Exception as e:
-            results['database'] = False
-            self.logger.error(f"❌ Conexão com banco de dados: {str(e)}")
+        # Testar banco de dados (a conexão já foi validada em connect_database)
+        results['database'] = self.connection is not None and not self.connection.closed
+        if results['database']:
+            self.logger.info("✅ Conexão com banco de dados: OK")
+        else:
+            self.logger.error("❌ Conexão com banco de dados: não estabelecida")
             
         # Testar Google Sheets
         try:
@@ -275,7 +658,7 @@ class StartupModule:
             self.logger.info(f"✅ Google Sheets API: OK ({len(sheets_info)} abas encontradas)")
         except Exception as e:
             results['google_sheets'] = False
-            self.logger.error(f"❌ Google Sheets API: {str(e)}")
+            self.logger.error(f"❌ Google Sheets API: {e}")
             
         # Testar Bitrix24
         try:
@@ -285,7 +668,7 @@ class StartupModule:
             self.logger.info("✅ Bitrix24 API: OK")
         except Exception as e:
             results['bitrix'] = False
-            self.logger.error(f"❌ Bitrix24 API: {str(e)}")
+            self.logger.error(f"❌ Bitrix24 API: {e}")
             
         return results
         
@@ -317,7 +700,7 @@ class StartupModule:
                 return log_id
                 
         except Exception as e:
-            self.logger.error(f"❌ Erro ao registrar início da sincronização: {str(e)}")
+            self.logger.error(f"❌ Erro ao registrar início da sincronização: {e}")
             return -1
             
     def log_sync_end(self, log_id: int, processed: int = 0, inserted: int = 0, 
@@ -335,6 +718,13 @@ class StartupModule:
             status (str): Status final ('SUCCESS', 'ERROR', 'PARTIAL')
             error_message (str): Mensagem de erro, se houver
         """
+        with self._pending_bitrix_logs_lock:
+            pending_logs, self._pending_bitrix_logs = self._pending_bitrix_logs, []
+        
+        # Logs do Bitrix gravados à parte: uma falha neles não impede o fechamento do sync_log
+        if pending_logs:
+            self._flush_bitrix_processing_logs(pending_logs)
+            
         try:
             with self.connection.cursor() as cursor:
                 cursor.execute("""
@@ -348,7 +738,50 @@ class StartupModule:
                 self.logger.info(f"   Processados: {processed}, Inseridos: {inserted}, Atualizados: {updated}, Falharam: {failed}")
                 
         except Exception as e:
-            self.logger.error(f"❌ Erro ao registrar fim da sincronização: {str(e)}")
+            self.logger.error(f"❌ Erro ao registrar fim da sincronização: {e}")
+    
+    def _flush_bitrix_processing_logs(self, pending_logs: List[tuple]):
+        """
+        Grava os registros de bitrix_processing_log acumulados na sessão.
+        
+        Tenta uma única instrução para o lote; se ela falhar, grava registro a
+        registro, para que uma linha inválida perca apenas o próprio log.
+        
+        Args:
+            pending_logs (List[tuple]): Valores na ordem de BITRIX_PROCESSING_LOG_COLUMNS
+        """
+        insert_sql = f"""
+            INSERT INTO bitrix_processing_log
+            ({', '.join(BITRIX_PROCESSING_LOG_COLUMNS)})
+            VALUES %s
+        """
+        
+        try:
+            with self.connection.cursor() as cursor:
+                execute_values(cursor, insert_sql, pending_logs, page_size=len(pending_logs))
+            return
+        except Exception as e:
+            self.logger.warning(f"⚠️ Gravação em lote dos logs do Bitrix falhou, gravando um a um: {e}")
+        
+        # A conexão principal está em autocommit: cada INSERT é confirmado independentemente
+        for values in pending_logs:
+            try:
+                with self.connection.cursor() as cursor:
+                    execute_values(cursor, insert_sql, [values])
+            except Exception as e:
+                self.logger.error(f"❌ Erro ao salvar log do processamento Bitrix: {e}")
+            
+    def queue_bitrix_processing_log(self, values: tuple):
+        """
+        Enfileira um registro de bitrix_processing_log para gravação em lote.
+        
+        Os registros pendentes são inseridos de uma só vez pelo próximo log_sync_end.
+        
+        Args:
+            values (tuple): Valores na ordem de BITRIX_PROCESSING_LOG_COLUMNS
+        """
+        with self._pending_bitrix_logs_lock:
+            self._pending_bitrix_logs.append(values)
             
     def startup(self) -> bool:
         """
@@ -385,12 +818,58 @@ class StartupModule:
             
         return all_success
         
+    def __enter__(self) -> 'StartupModule':
+        return self
+        
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        
     def close(self):
         """Fecha todas as conexões."""
-        if self.connection:
-            self.connection.close()
-            self.logger.info("🔌 Conexão com banco de dados fechada")
+        if self.pool:
+            self.pool.closeall()
+            self.pool = None
+            self.connection = None
+            self.logger.info("🔌 Conexões com banco de dados fechadas")
+            
+    def _fetch_sheet_for_validation(self, spreadsheet_id: str, sheet_id: int) -> Dict[str, Any]:
+        """
+        Busca e valida os dados de uma única aba.
+        
+        Args:
+            spreadsheet_id (str): ID da planilha do Google Sheets
+            sheet_id (int): ID da aba
+            
+        Returns:
+            Dict[str, Any]: Nome, linhas e informações da aba
             
+        Raises:
+            Exception: Se a busca falhar ou a estrutura retornada for inválida
+        """
+        self.logger.info(f"📊 Validando aba ID: {sheet_id}")
+        
+        # Tentar obter dados da aba - SE FALHAR AQUI, PARAR TUDO
+        sheet_data = self.google_sheets.get_sheet_data_as_json(
+            spreadsheet_id, 
+            sheet_id
+        )
+        
+        sheet_name = sheet_data['sheet_info']['sheet_name']
+        rows_data = sheet_data['data']
+        
+        # Validar se a aba tem estrutura mínima esperada
+        if 'sheet_info' not in sheet_data or 'data' not in sheet_data:
+            raise Exception(f"Estrutura de dados inválida retornada pela aba '{sheet_name}'")
+        
+        self.logger.info(f"✅ Aba '{sheet_name}' validada: {len(rows_data)} registros")
+        
+        return {
+            'sheet_name': sheet_name,
+            'data': rows_data,
+            'total_rows': len(rows_data),
+            'sheet_info': sheet_data['sheet_info']
+        }
+        
     def _validate_all_sheets_data(self, spreadsheet_id: str, sheet_ids: List[int]) -> Dict[str, Any]:
         """
         Valida e busca dados de TODAS as abas especificadas ANTES de fazer qualquer alteração no banco.
@@ -419,48 +898,39 @@ class StartupModule:
         try:
             self.logger.info(f"🔍 Validando dados de {len(sheet_ids)} abas ANTES de atualizar banco...")
             
-            # Tentar buscar dados de TODAS as abas primeiro
+            # Buscar dados de TODAS as abas em paralelo (chamadas de rede independentes)
+            fetched_sheets = {}
+            with ThreadPoolExecutor(max_workers=max(1, len(sheet_ids))) as executor:
+                futures = {
+                    executor.submit(self._fetch_sheet_for_validation, spreadsheet_id, sheet_id): sheet_id
+                    for sheet_id in sheet_ids
+                }
+                
+                for future in as_completed(futures):
+                    sheet_id = futures[future]
+                    try:
+                        fetched_sheets[sheet_id] = future.result()
+                        
+                    except Exception as sheet_error:
+                        error_msg = f"Erro ao buscar dados da aba ID {sheet_id}: {sheet_error}"
+                        self.logger.error(f"❌ {error_msg}")
+                        
+                        validation_result['failed_sheets'].append({
+                            'sheet_id': sheet_id,
+                            'error': str(sheet_error)
+                        })
+                        
+                        # SE QUALQUER ABA FALHAR, PARAR IMEDIATAMENTE (cancelando as buscas pendentes)
+                        for pending in futures:
+                            pending.cancel()
+                        validation_result['error_message'] = error_msg
+                        raise Exception(error_msg)
+            
+            # Armazenar dados na mesma ordem em que as abas foram solicitadas
             for sheet_id in sheet_ids:
-                try:
-                    self.logger.info(f"📊 Validando aba ID: {sheet_id}")
-                    
-                    # Tentar obter dados da aba - SE FALHAR AQUI, PARAR TUDO
-                    sheet_data = self.google_sheets.get_sheet_data_as_json(
-                        spreadsheet_id, 
-                        sheet_id
-                    )
-                    
-                    sheet_name = sheet_data['sheet_info']['sheet_name']
-                    rows_data = sheet_data['data']
-                    
-                    # Validar se a aba tem estrutura mínima esperada
-                    if 'sheet_info' not in sheet_data or 'data' not in sheet_data:
-                        raise Exception(f"Estrutura de dados inválida retornada pela aba '{sheet_name}'")
-                    
-                    # Armazenar dados da aba
-                    validation_result['sheets_data'][sheet_id] = {
-                        'sheet_name': sheet_name,
-                        'data': rows_data,
-                        'total_rows': len(rows_data),
-                        'sheet_info': sheet_data['sheet_info']
-                    }
-                    
-                    validation_result['total_records'] += len(rows_data)
-                    
-                    self.logger.info(f"✅ Aba '{sheet_name}' validada: {len(rows_data)} registros")
-                    
-                except Exception as sheet_error:
-                    error_msg = f"Erro ao buscar dados da aba ID {sheet_id}: {str(sheet_error)}"
-                    self.logger.error(f"❌ {error_msg}")
-                    
-                    validation_result['failed_sheets'].append({
-                        'sheet_id': sheet_id,
-                        'error': str(sheet_error)
-                    })
-                    
-                    # SE QUALQUER ABA FALHAR, PARAR IMEDIATAMENTE
-                    validation_result['error_message'] = error_msg
-                    raise Exception(error_msg)
+                validated_sheet = fetched_sheets[sheet_id]
+                validation_result['sheets_data'][sheet_id] = validated_sheet
+                validation_result['total_records'] += validated_sheet['total_rows']
             
             # Se chegou aqui, todas as abas foram validadas com sucesso
             validation_result['success'] = True
@@ -471,10 +941,199 @@ class StartupModule:
             
         except Exception as e:
             validation_result['error_message'] = str(e)
-            self.logger.error(f"❌ Falha na validação das abas: {str(e)}")
+            self.logger.error(f"❌ Falha na validação das abas: {e}")
             self.logger.error("🚫 ATUALIZAÇÃO DO BANCO CANCELADA - dados das planilhas não puderam ser obtidos")
             raise e
     
+    def _iter_sheet_rows(self, rows_data: List[Dict], sheet_name: str) -> Iterator[tuple]:
+        """
+        Converte as linhas de uma aba em tuplas prontas para leads_data.
+        
+        Linhas sem CNPJ e sem telefone são ignoradas. Datas inválidas viram NULL,
+        então nenhuma linha válida precisa de tratamento de exceção individual.
+        
+        Args:
+            rows_data (List[Dict]): Linhas da aba como retornadas pelo Google Sheets
+            sheet_name (str): Nome da aba, gravado como "banco"
+            
+        Yields:
+            tuple: Valores na ordem de LEADS_DATA_COLUMNS
+        """
+        get_fields = sheet_row_getter(rows_data)
+        invalid_dates = []
+        
+        for row in rows_data:
+            # Mapear campos do Google Sheets para campos da tabela
+            (data_value, cnpj_value, telefone_value, nome_value, empresa_value,
+             consultor_value, forma_prospeccao_value, etapa_value) = get_fields(row)
+            
+            # Validar se tem CNPJ OU TELEFONE (pelo menos um dos dois)
+            if not ((cnpj_value and cnpj_value.strip()) or (telefone_value and telefone_value.strip())):
+                continue  # Pular se não tem nem CNPJ nem telefone
+                
+            # Converter data para o formato adequado (None se vazia ou inválida)
+            parsed_date = parse_sheet_date(data_value)
+            if parsed_date is None and data_value and data_value.strip():
+                invalid_dates.append(data_value)
+            
+            yield (
+                parsed_date,
+                cnpj_value or None,
+                telefone_value or None,
+                nome_value or None,
+                empresa_value or None,
+                consultor_value or None,
+                forma_prospeccao_value or None,
+                etapa_value or None,
+                sheet_name  # Usar nome da aba como "Banco"
+            )
+        
+        self.log_invalid_dates(sheet_name, invalid_dates)
+    
+    def log_invalid_dates(self, sheet_name: str, invalid_dates: List[str]):
+        """
+        Registra num único aviso as datas inválidas de uma aba, em vez de uma linha por registro.
+        
+        Args:
+            sheet_name (str): Nome da aba
+            invalid_dates (List[str]): Valores de data que não puderam ser convertidos
+        """
+        if invalid_dates:
+            samples = ", ".join(invalid_dates[:INVALID_DATE_SAMPLES])
+            self.logger.warning(f"⚠️ Aba '{sheet_name}': {len(invalid_dates)} datas em formato inválido (ex.: {samples})")
+    
+    def copy_rows_to_leads_data(self, cursor, rows: Iterable[tuple], hashed: bool = False) -> int:
+        """
+        Insere registros em leads_data via COPY sem materializar uma lista intermediária.
+        
+        As linhas são serializadas em CSV por CopyRowStream enquanto o COPY as
+        consome, então a serialização se sobrepõe ao envio e a memória fica
+        limitada a um bloco de linhas.
+        
+        Args:
+            cursor: Cursor aberto na conexão de destino
+            rows (Iterable[tuple]): Tuplas na ordem de LEADS_DATA_COLUMNS
+            hashed (bool): Se True, as tuplas já estão na ordem de LEADS_DATA_LOAD_COLUMNS
+                (leads_load_row) e os hashes não são recalculados
+            
+        Returns:
+            int: Número de registros enviados
+        """
+        stream = CopyRowStream(rows, hashed=hashed)
+        cursor.copy_expert(COPY_LEADS_DATA_SQL, stream, size=COPY_READ_SIZE)
+        return stream.count
+    
+    def drop_leads_indexes(self, cursor=None):
+        """
+        Remove os índices secundários de leads_data antes de uma carga em massa.
+        
+        Inserir com os índices ausentes e reconstruí-los depois (ordenação única)
+        é bem mais rápido do que atualizar cada índice a cada linha.
+        
+        Args:
+            cursor: Cursor de uma transação em andamento (opcional). Sem ele, usa
+                a conexão principal em autocommit
+        """
+        drop_sql = "".join(f"DROP INDEX IF EXISTS {name};" for name in LEADS_DATA_INDEXES)
+        if cursor is not None:
+            cursor.execute(drop_sql)
+        else:
+            with self.connection.cursor() as cursor:
+                cursor.execute(drop_sql)
+        self.logger.info(f"🗂️ {len(LEADS_DATA_INDEXES)} índices de leads_data removidos para a carga")
+    
+    def create_leads_indexes(self, cursor):
+        """
+        Cria os índices secundários de leads_data, em sequência, no cursor informado.
+        
+        Usado dentro de transações: os índices precisam ser construídos na mesma
+        sessão que carregou as linhas ainda não confirmadas. Fora delas,
+        rebuild_leads_indexes constrói em paralelo.
+        
+        Args:
+            cursor: Cursor aberto na conexão de destino
+        """
+        cursor.execute("\n".join(LEADS_DATA_INDEXES.values()))
+        
+    def _create_index(self, index_sql: str):
+        """Cria um índice numa conexão própria do pool, para que os índices sejam construídos em paralelo."""
+        connection = self._get_conn()
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(index_sql)
+        finally:
+            self._put_conn(connection)
+            
+    def rebuild_leads_indexes(self) -> bool:
+        """
+        Recria os índices secundários de leads_data em paralelo.
+        
+        Cada índice é construído numa sessão separada, permitindo que o PostgreSQL
+        use vários núcleos ao mesmo tempo. As sessões vêm do pool, sem contar a
+        conexão principal, que já está emprestada.
+        
+        Returns:
+            bool: True se todos os índices foram criados
+        """
+        try:
+            max_workers = max(1, min(DB_POOL_MAX_CONNECTIONS - 1, len(LEADS_DATA_INDEXES)))
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                # list() propaga a primeira exceção ocorrida em qualquer thread
+                list(executor.map(self._create_index, LEADS_DATA_INDEXES.values()))
+            self.logger.info(f"🗂️ {len(LEADS_DATA_INDEXES)} índices de leads_data recriados")
+            return True
+            
+        except Exception as e:
+            self.logger.error(f"❌ Erro ao recriar índices de leads_data: {e}")
+            return False
+            
+    def analyze_leads_data(self):
+        """
+        Atualiza as estatísticas e o mapa de visibilidade de leads_data após uma carga em massa.
+        
+        Sem isso o planejador pode ignorar os índices recém-criados (por exemplo,
+        idx_leads_banco nas contagens por aba) até o autovacuum rodar, e as
+        contagens por banco/consultor não conseguem usar index-only scan.
+        """
+        try:
+            # VACUUM não roda dentro de transação: a conexão principal está em autocommit
+            with self.connection.cursor() as cursor:
+                cursor.execute("VACUUM (ANALYZE) leads_data;")
+        except Exception as e:
+            self.logger.warning(f"⚠️ Erro ao atualizar estatísticas de leads_data: {e}")
+            
+    def _copy_sheet_to_leads_data(self, sheets_data: Dict[int, Dict], sheet_id: int) -> tuple:
+        """
+        Carrega uma aba já validada em leads_data via COPY, numa conexão própria do pool.
+        
+        Args:
+            sheets_data (Dict[int, Dict]): Abas validadas por _validate_all_sheets_data
+            sheet_id (int): ID da aba a carregar
+            
+        Returns:
+            tuple: (nome da aba, linhas na aba, registros inseridos)
+        """
+        # Usar dados já validados ao invés de buscar novamente
+        validated_sheet = sheets_data[sheet_id]
+        sheet_name = validated_sheet['sheet_name']
+        rows_data = validated_sheet['data']
+        
+        self.logger.info(f"📊 Processando aba '{sheet_name}': {len(rows_data)} registros")
+        
+        # Inserir dados em massa na tabela (permitindo duplicatas) via COPY,
+        # validando e enviando cada linha sem acumular uma lista intermediária
+        with self.pooled_connection() as connection:
+            with self.transaction(connection) as cursor:
+                # A tabela acabou de ser esvaziada e é recarregada por inteiro: numa queda,
+                # no máximo esta carga se perde e a próxima sincronização a refaz
+                cursor.execute("SET LOCAL synchronous_commit TO OFF;")
+                inserted_count = self.copy_rows_to_leads_data(
+                    cursor,
+                    self._iter_sheet_rows(rows_data, sheet_name)
+                )
+        
+        return sheet_name, len(rows_data), inserted_count
+    
     def populate_table_from_sheets(self, spreadsheet_id: str, sheet_ids: List[int]) -> bool:
         """
         Popula a tabela leads_data com dados do Google Sheets.
@@ -503,9 +1162,9 @@ class StartupModule:
             try:
                 validation_result = self._validate_all_sheets_data(spreadsheet_id, sheet_ids)
             except Exception as validation_error:
-                self.logger.error(f"❌ VALIDAÇÃO FALHOU: {str(validation_error)}")
+                self.logger.error(f"❌ VALIDAÇÃO FALHOU: {validation_error}")
                 self.logger.error("🚫 Atualização do banco CANCELADA por falha na validação das planilhas")
-                self.log_sync_end(log_id, status='ERROR', error_message=f"Validação falhou: {str(validation_error)}")
+                self.log_sync_end(log_id, status='ERROR', error_message=f"Validação falhou: {validation_error}")
                 return False
             
             if not validation_result['success']:
@@ -520,95 +1179,50 @@ class StartupModule:
             # 2. AGORA é seguro limpar e atualizar o banco (dados já validados)
             self.logger.info("🗑️ Limpando tabela leads_data (dados validados, operação segura)...")
             with self.connection.cursor() as cursor:
-                cursor.execute("DELETE FROM leads_data;")
+                # TRUNCATE não varre nem registra cada linha no WAL e não deixa bloat
+                cursor.execute("TRUNCATE leads_data RESTART IDENTITY;")
                 self.logger.info("✅ Dados existentes removidos da tabela leads_data")
             
             total_processed = 0
             total_inserted = 0
             total_failed = 0
             
-            # 3. Processar cada aba usando os dados já validados
-            for sheet_id in sheet_ids:
-                try:
-                    # Usar dados já validados ao invés de buscar novamente
-                    validated_sheet = validation_result['sheets_data'][sheet_id]
-                    sheet_name = validated_sheet['sheet_name']
-                    rows_data = validated_sheet['data']
-                    
-                    self.logger.info(f"📊 Processando aba '{sheet_name}': {len(rows_data)} registros")
-                    
-                    # Preparar lista para inserção em massa
-                    insert_values = []
-                    failed_count = 0
+            # Índices são removidos durante a carga e recriados ao final, mesmo em caso de falha
+            self.drop_leads_indexes()
+            try:
+                # 3. Carregar as abas (dados já validados) em paralelo, cada uma com seu
+                #    próprio COPY numa conexão do pool; a conexão principal fica de fora
+                max_workers = max(1, min(DB_POOL_MAX_CONNECTIONS - 1, len(sheet_ids)))
+                with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                    futures = {
+                        executor.submit(self._copy_sheet_to_leads_data, validation_result['sheets_data'], sheet_id): sheet_id
+                        for sheet_id in sheet_ids
+                    }
                     
-                    for row in rows_data:
+                    for future in as_completed(futures):
+                        sheet_id = futures[future]
                         try:
-                            # Mapear campos do Google Sheets para campos da tabela
-                            data_value = row.get('Data', row.get('data', ''))
-                            cnpj_value = row.get('CNPJ', row.get('cnpj', ''))
-                            telefone_value = row.get('TELEFONE', row.get('telefone', ''))
-                            nome_value = row.get('NOME', row.get('nome', ''))
-                            empresa_value = row.get('EMPRESA', row.get('empresa', ''))
-                            consultor_value = row.get('CONSULTOR', row.get('consultor', ''))
-                            forma_prospeccao_value = row.get('Forma Prospecção', row.get('forma_prospeccao', ''))
-                            etapa_value = row.get('Etapa', row.get('etapa', ''))
-                            
-                            # Validar se tem CNPJ OU TELEFONE (pelo menos um dos dois)
-                            has_cnpj = cnpj_value and cnpj_value.strip()
-                            has_telefone = telefone_value and telefone_value.strip()
-                            
-                            if not (has_cnpj or has_telefone):
-                                continue  # Pular se não tem nem CNPJ nem telefone
-                                
-                            # Converter data para o formato adequado
-                            parsed_date = None
-                            if data_value and isinstance(data_value, str) and data_value.strip():
-                                try:
-                                    parsed_date = datetime.strptime(data_value.strip(), '%d/%m/%Y').date()
-                                except ValueError:
-                                    self.logger.warning(f"⚠️ Formato de data inválido: {data_value}")
+                            sheet_name, total_rows, inserted_count = future.result()
                             
-                            # Adicionar valores à lista para inserção em massa
-                            insert_values.append((
-                                parsed_date,
-                                cnpj_value or None,
-                                telefone_value or None,
-                                nome_value or None,
-                                empresa_value or None,
-                                consultor_value or None,
-                                forma_prospeccao_value or None,
-                                etapa_value or None,
-                                sheet_name  # Usar nome da aba como "Banco"
-                            ))
+                            total_processed += total_rows
+                            total_inserted += inserted_count
                             
-                        except Exception as row_error:
-                            failed_count += 1
-                            self.logger.warning(f"⚠️ Erro ao preparar registro: {str(row_error)}")
+                            self.logger.info(f"✅ Aba '{sheet_name}': {inserted_count} inseridos")
                             
-                    # 4. Inserir dados em massa na tabela (permitindo duplicatas)
-                    inserted_count = 0
-                    if insert_values:
-                        with self.connection.cursor() as cursor:
-                            insert_sql = """
-                            INSERT INTO leads_data 
-                            (data, cnpj, telefone, nome, empresa, consultor, forma_prospeccao, etapa, banco)
-                            VALUES %s
-                            """
-                            
-                            # Executar inserção em massa
-                            execute_values(cursor, insert_sql, insert_values)
-                            inserted_count = len(insert_values)
-
-                    total_processed += len(rows_data)
-                    total_inserted += inserted_count
-                    total_failed += failed_count
-                    
-                    self.logger.info(f"✅ Aba '{sheet_name}': {inserted_count} inseridos, {failed_count} falharam")
-                    
-                except Exception as sheet_error:
-                    self.logger.error(f"❌ Erro ao processar aba ID {sheet_id}: {str(sheet_error)}")
-                    total_failed += 1
+                        except Exception as sheet_error:
+                            self.logger.error(f"❌ Erro ao processar aba ID {sheet_id}: {sheet_error}")
+                            total_failed += 1
                     
+            finally:
+                indexes_rebuilt = self.rebuild_leads_indexes()
+            
+            # Sem os índices a tabela fica inutilizável para as consultas: a carga é tratada como erro
+            if not indexes_rebuilt:
+                raise Exception("Falha ao recriar os índices de leads_data")
+                
+            # 4. Atualizar estatísticas do planejador após a carga em massa
+            self.analyze_leads_data()
+                
             # 5. Log final da sincronização
             self.log_sync_end(
                 log_id, 
@@ -625,70 +1239,86 @@ class StartupModule:
             
         except Exception as e:
             self.log_sync_end(log_id, status='ERROR', error_message=str(e))
-            self.logger.error(f"❌ Erro durante sincronização: {str(e)}")
+            self.logger.exception(f"❌ Erro durante sincronização: {e}")
             return False
 
+def print_bank_stats(startup: 'StartupModule'):
+    """
+    Exibe o total de registros e a contagem por aba após a sincronização.
+    
+    Executada numa thread própria, com uma conexão do pool exclusiva dela.
+    
+    Args:
+        startup (StartupModule): Módulo de startup já conectado
+    """
+    try:
+        with startup.pooled_connection() as connection:
+            total_records, bank_stats = load_bank_stats(connection)
+        
+        # Uma única mensagem para não intercalar com as mensagens da thread principal
+        if log.isEnabledFor(logging.INFO):
+            log.info(
+                "📈 Total de registros inseridos: %s\n📋 Registros por aba:\n%s",
+                total_records,
+                "\n".join(f"   - {banco}: {count} registros" for banco, count in bank_stats)
+            )
+        
+    except Exception as stats_error:
+        log.warning("⚠️ Erro ao obter estatísticas: %s", stats_error)
+
+
 def main():
     """Função principal para executar o startup."""
-    startup = StartupModule()
+    stats_thread = None
     
     try:
-        success = startup.startup()
-        
-        if success:
-            print("✅ Sistema inicializado com sucesso!")
-            
-            # Definir as configurações para sincronização com Google Sheets
-            spreadsheet_id = os.getenv('SPREADSHEET_ID')
-            
-            # Obter IDs das abas via variável de ambiente
-            sheet_ids_str = os.getenv('SHEET_IDS', '0,829477907,797561708,1064048522')
-            sheet_ids = [int(id.strip()) for id in sheet_ids_str.split(',')]
-            
-            if spreadsheet_id:
-                print("🔄 Iniciando sincronização com Google Sheets...")
-                print(f"📋 IDs das abas: {sheet_ids}")
-                sync_success = startup.populate_table_from_sheets(spreadsheet_id, sheet_ids)
+        with StartupModule() as startup:
+            try:
+                success = startup.startup()
                 
-                if sync_success:
-                    print("✅ Sincronização com Google Sheets concluída com sucesso!")
-                    print("📊 Dados das planilhas foram carregados na tabela leads_data")
+                if success:
+                    log.info("✅ Sistema inicializado com sucesso!")
                     
-                    # Mostrar estatísticas simples
-                    try:
-                        with startup.connection.cursor() as cursor:
-                            cursor.execute("SELECT COUNT(*) as total FROM leads_data;")
-                            total_records = cursor.fetchone()['total']
-                            
-                            cursor.execute("SELECT banco, COUNT(*) as count FROM leads_data GROUP BY banco ORDER BY count DESC;")
-                            bank_stats = cursor.fetchall()
+                    # Definir as configurações para sincronização com Google Sheets
+                    spreadsheet_id = os.getenv('SPREADSHEET_ID')
+                    
+                    # IDs das abas já validados ao carregar o ambiente
+                    sheet_ids = list(startup.sheet_ids)
+                    
+                    if spreadsheet_id:
+                        log.info("🔄 Iniciando sincronização com Google Sheets...")
+                        log.info("📋 IDs das abas: %s", sheet_ids)
+                        sync_success = startup.populate_table_from_sheets(spreadsheet_id, sheet_ids)
+                        
+                        if sync_success:
+                            log.info("✅ Sincronização com Google Sheets concluída com sucesso!")
+                            log.info("📊 Dados das planilhas foram carregados na tabela leads_data")
                             
-                            print(f"📈 Total de registros inseridos: {total_records}")
-                            print("📋 Registros por aba:")
-                            for stat in bank_stats:
-                                print(f"   - {stat['banco']}: {stat['count']} registros")
-                                
-                    except Exception as stats_error:
-                        print(f"⚠️ Erro ao obter estatísticas: {stats_error}")
+                            # Mostrar estatísticas simples em segundo plano (apenas informativas)
+                            stats_thread = threading.Thread(target=print_bank_stats, args=(startup,), daemon=True)
+                            stats_thread.start()
                         
+                        else:
+                            log.error("❌ Falha na sincronização com Google Sheets")
+                            log.error("📋 Verifique os logs para mais detalhes")
+                    else:
+                        log.warning("⚠️ SPREADSHEET_ID não configurado - pulando sincronização")
+                        log.warning("💡 Configure a variável SPREADSHEET_ID no arquivo .env para habilitar a sincronização")
+                    
+                    log.info("💡 Sistema pronto para uso!")
                 else:
-                    print("❌ Falha na sincronização com Google Sheets")
-                    print("📋 Verifique os logs para mais detalhes")
-            else:
-                print("⚠️ SPREADSHEET_ID não configurado - pulando sincronização")
-                print("💡 Configure a variável SPREADSHEET_ID no arquivo .env para habilitar a sincronização")
-                
-            print("💡 Sistema pronto para uso!")
-        else:
-            print("❌ Falha na inicialização do sistema")
-            print("📋 Verifique os logs para mais detalhes")
+                    log.error("❌ Falha na inicialização do sistema")
+                    log.error("📋 Verifique os logs para mais detalhes")
             
+            finally:
+                # As estatísticas precisam terminar antes de o pool de conexões ser fechado
+                if stats_thread is not None:
+                    stats_thread.join(timeout=STATS_THREAD_JOIN_TIMEOUT_SECONDS)
+    
     except KeyboardInterrupt:
-        print("\n⏹️ Processo interrompido pelo usuário")
-    except Exception as e:
-        print(f"❌ Erro durante inicialização: {str(e)}")
-    finally:
-        startup.close()
+        log.info("⏹️ Processo interrompido pelo usuário")
+    except Exception:
+        log.exception("❌ Erro durante inicialização")
 
 
 # if __name__ == "__main__":
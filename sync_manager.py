@@ -5,8 +5,8 @@
 Módulo de Sincronização Contínua para Google Sheets e Banco de Dados.
 
 Este módulo utiliza os objetos já inicializados do startup para realizar
-sincronização contínua entre Google Sheets e PostgreSQL, limpando e
-reinserindo todos os dados a cada execução, mas retornando as diferenças detectadas.
+sincronização contínua entre Google Sheets e PostgreSQL, aplicando no banco
+apenas as linhas que mudaram a cada execução e retornando as diferenças detectadas.
 
 Author: Sistema de Sincronização Aliest
 Date: June 2025
@@ -14,15 +14,79 @@ Date: June 2025
 
 import os
 import logging
-import hashlib
-import json
+import time
+from collections import Counter
+from contextlib import contextmanager
 from typing import Dict, List, Any, Optional
-from datetime import datetime, timedelta
+from datetime import date
+from psycopg2.extensions import cursor as TupleCursor
 from psycopg2.extras import execute_values
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 
+from startup import (
+    LEADS_DATA_COLUMNS, LEADS_DATA_LOAD_COLUMNS, leads_load_row,
+    sheet_row_getter, parse_sheet_date
+)
 
-@dataclass
+
+# Linhas por instrução INSERT quando a carga não usa COPY
+INSERT_PAGE_SIZE = 10000
+
+# INSERT multi-linha da carga sem COPY: cada linha é formatada (mogrify) com o template
+# fixo e até INSERT_PAGE_SIZE linhas vão numa única instrução
+INSERT_LEADS_SQL = f"INSERT INTO leads_data ({', '.join(LEADS_DATA_LOAD_COLUMNS)}) VALUES %s"
+INSERT_LEADS_TEMPLATE = f"({', '.join(['%s'] * len(LEADS_DATA_LOAD_COLUMNS))})"
+
+LEADS_DATA_VERSION_SQL = "SELECT version FROM leads_data_version;"
+
+# Linhas trazidas por lote pelos cursores nomeados (lado servidor) que leem os hashes
+HASH_FETCH_SIZE = 10000
+
+# Posição dos hashes nas linhas de carga (leads_load_row), calculados uma única vez por linha
+CONTENT_HASH_INDEX = LEADS_DATA_LOAD_COLUMNS.index('content_hash')
+CHANGE_HASH_INDEX = LEADS_DATA_LOAD_COLUMNS.index('change_hash')
+
+# Tipos de sincronização (sync_log.sync_type) considerados em get_sync_statistics,
+# incluindo os nomes usados antes da validação prévia das abas
+SYNC_STATISTICS_TYPES = ('clear_and_resync_validated', 'sheets_to_db_validated',
+                         'clear_and_resync', 'sheets_to_db')
+
+# Resumo de leads_data numa única varredura: GROUPING(banco, consultor) identifica o
+# conjunto de cada linha (3 = total geral, 1 = por banco, 2 = por consultor)
+SUMMARY_TOTALS = 3
+SUMMARY_BY_BANCO = 1
+DATA_SUMMARY_SQL = """
+    SELECT GROUPING(banco, consultor) AS grouping_set,
+           banco, consultor,
+           COUNT(*) AS count,
+           MAX(created_at) AS last_insert,
+           MAX(updated_at) AS last_update
+    FROM leads_data
+    GROUP BY GROUPING SETS ((), (banco), (consultor))
+    ORDER BY grouping_set, count DESC;
+"""
+
+# Colunas lidas do banco para os registros reportados como removidos/inalterados
+SNAPSHOT_COLUMNS = ('id',) + LEADS_DATA_COLUMNS + ('created_at', 'updated_at')
+
+# Fração da tabela acima da qual a sincronização troca o delta por TRUNCATE + carga completa
+FULL_RELOAD_CHANGE_RATIO = 0.5
+
+# Memória para ordenação na reconstrução dos índices após uma carga completa
+INDEX_BUILD_MAINTENANCE_WORK_MEM = '256MB'
+
+# Chamadas simultâneas à API do Bitrix durante o processamento de registros
+BITRIX_MAX_WORKERS = 16
+
+# Registros enviados ao Bitrix por sincronização
+BITRIX_MAX_RECORDS_PER_SYNC = 50
+
+# Abas buscadas simultaneamente no Google Sheets durante a validação
+SHEETS_MAX_WORKERS = 8
+
+
+@dataclass(slots=True)
 class SyncResult:
     """
     Classe para representar o resultado de uma sincronização.
@@ -35,9 +99,10 @@ class SyncResult:
         error_message (str): Mensagem de erro, se houver
         sheets_data (Dict): Dados detalhados por aba processada
         changes_detected (Dict): Diferenças detectadas entre antes/depois
-        new_records (List[Dict]): Registros que são novos
-        removed_records (List[Dict]): Registros que foram removidos
-        unchanged_records (List[Dict]): Registros que permaneceram iguais
+        new_records (Optional[List[Dict]]): Registros que são novos
+        removed_records (Optional[List[Dict]]): Registros que foram removidos
+        unchanged_records (Optional[List[Dict]]): Registros que permaneceram iguais (só quando solicitados)
+        unchanged_count (int): Quantidade de registros que permaneceram iguais
         bitrix_processing (Dict): Resultado do processamento no Bitrix
     """
     total_processed: int = 0
@@ -45,26 +110,14 @@ class SyncResult:
     failed_records: int = 0
     sync_duration: float = 0.0
     error_message: str = None
-    sheets_data: Dict = None
-    changes_detected: Dict = None
-    new_records: List[Dict] = None
-    removed_records: List[Dict] = None
-    unchanged_records: List[Dict] = None
-    bitrix_processing: Dict = None
-    
-    def __post_init__(self):
-        if self.sheets_data is None:
-            self.sheets_data = {}
-        if self.changes_detected is None:
-            self.changes_detected = {}
-        if self.new_records is None:
-            self.new_records = []
-        if self.removed_records is None:
-            self.removed_records = []
-        if self.unchanged_records is None:
-            self.unchanged_records = []
-        if self.bitrix_processing is None:
-            self.bitrix_processing = {}
+    sheets_data: Dict = field(default_factory=dict)
+    changes_detected: Dict = field(default_factory=dict)
+    # Listas ficam None até a comparação de snapshots; consumidores usam `or []`
+    new_records: Optional[List[Dict]] = None
+    removed_records: Optional[List[Dict]] = None
+    unchanged_records: Optional[List[Dict]] = None
+    unchanged_count: int = 0
+    bitrix_processing: Dict = field(default_factory=dict)
 
 
 class SyncManager:
@@ -82,16 +135,22 @@ class SyncManager:
     Estratégia: Limpeza total + reinserção + detecção de diferenças
     """
     
-    def __init__(self, startup_instance):
+    def __init__(self, startup_instance, use_copy: bool = True):
         """
         Inicializa o gerenciador de sincronização.
         
         Args:
             startup_instance: Instância do StartupModule já inicializada
+            use_copy (bool): Carrega leads_data via COPY (padrão). Se False, usa
+                INSERT multi-linha com execute_values (ex.: quando COPY não é permitido)
         """
         self.startup = startup_instance
+        self.use_copy = use_copy
         self.logger = logging.getLogger(__name__)
         
+        # Snapshot deixado pela última sincronização: (versão de leads_data, snapshot)
+        self._snapshot_cache = None
+        
         # Validar se o startup foi inicializado corretamente
         if not self.startup.connection:
             raise ValueError("StartupModule não possui conexão com banco de dados")
@@ -100,64 +159,135 @@ class SyncManager:
             
         self.logger.info("✅ SyncManager inicializado com sucesso")
     
-    def _calculate_record_hash(self, record: Dict[str, Any]) -> str:
+    @contextmanager
+    def _transaction(self):
         """
-        Calcula hash de um registro para detectar mudanças.
+        Executa um bloco numa transação explícita na conexão principal
+        (ver StartupModule.transaction).
+        
+        Yields:
+            cursor: Cursor aberto dentro da transação
+        """
+        with self.startup.transaction() as cursor:
+            yield cursor
+    
+    def _insert_leads_rows(self, cursor, rows: List[tuple]) -> int:
+        """
+        Insere registros em leads_data pelo caminho de carga configurado.
         
         Args:
-            record (Dict): Registro de dados
+            cursor: Cursor aberto na transação de sincronização
+            rows: Linhas de carga (leads_load_row), já com os hashes
             
         Returns:
-            str: Hash MD5 do registro
+            int: Número de registros inseridos
         """
-        # Campos relevantes para comparação (excluindo IDs e timestamps)
-        relevant_fields = ['data', 'cnpj', 'telefone', 'nome', 'empresa', 
-                          'consultor', 'forma_prospeccao', 'etapa', 'banco']
-        
-        # Criar string normalizada dos dados relevantes
-        data_string = ""
-        for field in relevant_fields:
-            value = str(record.get(field, '')).strip().lower()
-            # Normalizar data se existir
-            if field == 'data' and value:
-                try:
-                    # Tentar converter para formato padrão
-                    if '/' in value:
-                        dt = datetime.strptime(value, '%Y-%m-%d')
-                        value = dt.strftime('%d/%m/%Y')
-                except:
-                    pass
-            data_string += f"{field}:{value}|"
-        
-        return hashlib.md5(data_string.encode('utf-8')).hexdigest()
+        if self.use_copy:
+            return self.startup.copy_rows_to_leads_data(cursor, rows, hashed=True)
+        
+        if rows:
+            # page_size alto: cada instrução leva milhares de linhas (o padrão é 100)
+            execute_values(
+                cursor,
+                INSERT_LEADS_SQL,
+                rows,
+                template=INSERT_LEADS_TEMPLATE,
+                page_size=INSERT_PAGE_SIZE
+            )
+        return len(rows)
+    
+    def _apply_leads_delta(self, cursor, rows: List[tuple]) -> Dict[str, int]:
+        """
+        Aplica em leads_data apenas a diferença para as linhas vindas das planilhas.
+        
+        leads_data permite duplicatas, então a comparação é feita pela contagem de
+        cada content_hash: hashes cuja contagem mudou têm suas linhas apagadas e
+        reinseridas, e os demais ficam intocados. Quando a maior parte da tabela
+        mudaria, TRUNCATE + carga completa sai mais barato.
+        
+        Args:
+            cursor: Cursor aberto na transação de sincronização
+            rows: Linhas de carga (leads_load_row), já com os hashes
+            
+        Returns:
+            Dict: Quantidade de registros inseridos, removidos e mantidos
+        """
+        # Cursor nomeado na mesma transação (sem WITH HOLD): contagens chegam em lotes,
+        # já como pares (hash, contagem)
+        with cursor.connection.cursor(name='leads_content_counts_cur',
+                                      cursor_factory=TupleCursor) as counts_cursor:
+            counts_cursor.itersize = HASH_FETCH_SIZE
+            counts_cursor.execute("SELECT content_hash, COUNT(*) FROM leads_data GROUP BY content_hash;")
+            old_counts = dict(counts_cursor)
+        old_total = sum(old_counts.values())
+        
+        row_hashes = [row[CONTENT_HASH_INDEX] for row in rows]
+        new_counts = Counter(row_hashes)
+        changed = {h for h in old_counts.keys() | new_counts.keys() if old_counts.get(h) != new_counts.get(h)}
+        deleted = sum(old_counts.get(h, 0) for h in changed)
+        
+        # Linhas sem content_hash não podem ser removidas seletivamente
+        if None in old_counts or deleted > old_total * FULL_RELOAD_CHANGE_RATIO:
+            # Carga completa: índices secundários removidos antes e reconstruídos depois
+            # (uma ordenação por índice), na própria transação, já que outras conexões
+            # não enxergam as linhas ainda não confirmadas
+            cursor.execute("SET LOCAL maintenance_work_mem = %s;", (INDEX_BUILD_MAINTENANCE_WORK_MEM,))
+            self.startup.drop_leads_indexes(cursor)
+            cursor.execute("TRUNCATE leads_data RESTART IDENTITY;")
+            inserted = self._insert_leads_rows(cursor, rows)
+            self.startup.create_leads_indexes(cursor)
+            return {'inserted': inserted, 'deleted': old_total, 'kept': 0}
+        
+        if deleted:
+            cursor.execute(
+                "DELETE FROM leads_data WHERE content_hash = ANY(%s);",
+                (list(changed & old_counts.keys()),)
+            )
+        inserted = self._insert_leads_rows(
+            cursor, [row for row, row_hash in zip(rows, row_hashes) if row_hash in changed]
+        )
+        return {'inserted': inserted, 'deleted': deleted, 'kept': old_total - deleted}
     
-    def _capture_current_snapshot(self) -> Dict[str, Dict]:
+    def _capture_current_snapshot(self) -> Dict[int, int]:
         """
         Captura snapshot dos dados atualmente no banco antes da limpeza.
         
+        O snapshot é só o conjunto de change_hash (com a contagem de linhas de cada
+        um), agregado pelo PostgreSQL: as linhas em si não trafegam. Os registros que
+        precisarem ser reportados são buscados depois por _fetch_snapshot_records.
+        
+        Se leads_data não mudou desde a última sincronização (mesma versão em
+        leads_data_version), o snapshot deixado por ela é reutilizado sem ler a tabela.
+        
         Returns:
-            Dict: Dicionário com hash como chave e dados completos como valor
+            Dict: Dicionário com hash como chave e quantidade de linhas como valor
         """
         try:
+            # Versão lida ANTES do snapshot: uma escrita concorrente só pode deixá-la
+            # mais antiga que os dados, o que invalida o cache na próxima vez
             with self.startup.connection.cursor() as cursor:
+                cursor.execute(LEADS_DATA_VERSION_SQL)
+                version = cursor.fetchone()['version']
+            
+            if self._snapshot_cache and self._snapshot_cache[0] == version:
+                snapshot = self._snapshot_cache[1]
+                self.logger.info(f"📸 Snapshot antes da limpeza: {len(snapshot)} registros (leads_data inalterada desde a última sincronização)")
+                return snapshot
+            
+            # Cursor nomeado (lado servidor): os hashes chegam em lotes de itersize.
+            # WITH HOLD é necessário porque a conexão opera em autocommit.
+            # Cursor de tuplas (e não RealDictCursor): cada linha vira um par do dicionário.
+            with self.startup.connection.cursor(name='leads_snapshot_cur', withhold=True,
+                                                cursor_factory=TupleCursor) as cursor:
+                cursor.itersize = HASH_FETCH_SIZE
                 cursor.execute("""
-                    SELECT id, data, cnpj, telefone, nome, empresa, 
-                           consultor, forma_prospeccao, etapa, banco, 
-                           created_at, updated_at
-                    FROM leads_data 
-                    ORDER BY id;
+                    SELECT change_hash, COUNT(*)
+                    FROM leads_data
+                    WHERE change_hash IS NOT NULL
+                    GROUP BY change_hash;
                 """)
                 
-                records = cursor.fetchall()
-                snapshot = {}
-                
-                for record in records:
-                    # Converter record para dict
-                    record_dict = dict(record) if hasattr(record, 'keys') else record
-                    
-                    # Calcular hash para este registro
-                    record_hash = self._calculate_record_hash(record_dict)
-                    snapshot[record_hash] = record_dict
+                snapshot = dict(cursor)
                 
                 self.logger.info(f"📸 Snapshot antes da limpeza: {len(snapshot)} registros")
                 return snapshot
@@ -166,45 +296,64 @@ class SyncManager:
             self.logger.error(f"❌ Erro ao capturar snapshot: {str(e)}")
             return {}
     
-    def _create_new_data_snapshot(self, all_insert_values: List[tuple], sheet_names: List[str]) -> Dict[str, Dict]:
+    def _fetch_snapshot_records(self, hashes) -> List[Dict]:
+        """
+        Busca no banco um registro por change_hash, para os hashes informados.
+        
+        Args:
+            hashes: Hashes (change_hash) dos registros
+            
+        Returns:
+            List[Dict]: Registros com as colunas de SNAPSHOT_COLUMNS
+        """
+        if not hashes:
+            return []
+        
+        with self.startup.connection.cursor() as cursor:
+            cursor.execute(f"""
+                SELECT DISTINCT ON (change_hash) {', '.join(SNAPSHOT_COLUMNS)}
+                FROM leads_data
+                WHERE change_hash = ANY(%s)
+                ORDER BY change_hash, id DESC;
+            """, (list(hashes),))
+            # RealDictCursor (padrão da conexão) já entrega cada linha como dict
+            return cursor.fetchall()
+    
+    def _create_new_data_snapshot(self, all_insert_values: List[tuple]) -> Dict[int, Dict]:
         """
         Cria snapshot dos novos dados que serão inseridos.
         
         Args:
-            all_insert_values: Lista de tuplas com dados para inserção
-            sheet_names: Lista com nomes das abas correspondentes
+            all_insert_values: Linhas de carga (leads_load_row) com os dados para inserção;
+                o nome da aba já é a coluna banco de cada linha
             
         Returns:
             Dict: Dicionário com hash como chave e dados como valor
         """
         snapshot = {}
-        duplicate_count = 0
         
         try:
-            # Mapeamento dos campos conforme a ordem da inserção
-            field_names = ['data', 'cnpj', 'telefone', 'nome', 'empresa', 
-                          'consultor', 'forma_prospeccao', 'etapa', 'banco']
-            
-            for values in all_insert_values:
-                # Criar dicionário do registro
-                record_dict = {}
-                for i, field in enumerate(field_names):
-                    if i < len(values):
-                        record_dict[field] = values[i]
-                    else:
-                        record_dict[field] = None
-                
-                # Calcular hash
-                record_hash = self._calculate_record_hash(record_dict)
-                
-                # Verificar se já existe este hash (duplicata)
-                if record_hash in snapshot:
-                    duplicate_count += 1
-                else:
-                    snapshot[record_hash] = record_dict
+            # Hash já calculado na montagem de cada linha (mesmo valor gravado em change_hash)
+            hashes = [row[CHANGE_HASH_INDEX] for row in all_insert_values]
+            
+            # Deduplicação feita em C: percorrendo de trás para frente, a última atribuição
+            # de cada hash é a da sua primeira ocorrência
+            first_index = dict(zip(reversed(hashes), range(len(hashes) - 1, -1, -1)))
+            hash_counts = Counter(hashes)
+            
+            # O dicionário do registro só é montado uma vez por hash
+            for record_hash, index in first_index.items():
+                record_dict = dict(zip(LEADS_DATA_COLUMNS, all_insert_values[index]))
+                # Hash e campos-chave normalizados ficam em cache para o processamento no Bitrix
+                record_dict['_hash'] = record_hash
+                record_dict['_count'] = hash_counts[record_hash]
+                record_dict['_cnpj_n'] = self._normalized_field(record_dict, 'cnpj')
+                record_dict['_telefone_n'] = self._normalized_field(record_dict, 'telefone')
+                snapshot[record_hash] = record_dict
             
             total_records = len(all_insert_values)
             unique_records = len(snapshot)
+            duplicate_count = total_records - unique_records
             
             self.logger.info(f"📸 Snapshot dos novos dados: {unique_records} registros únicos de {total_records} totais")
             if duplicate_count > 0:
@@ -216,42 +365,65 @@ class SyncManager:
             self.logger.error(f"❌ Erro ao criar snapshot dos novos dados: {str(e)}")
             return {}
     
-    def _compare_snapshots(self, old_snapshot: Dict, new_snapshot: Dict) -> Dict[str, List]:
+    @staticmethod
+    def _normalized_field(record: Dict[str, Any], field: str) -> str:
+        """
+        Retorna o campo do registro sem espaços nas pontas, usando o valor em cache quando houver.
+        
+        Args:
+            record: Registro de dados
+            field: Nome do campo
+            
+        Returns:
+            str: Valor normalizado ou string vazia
+        """
+        cached = record.get(f'_{field}_n')
+        if cached is not None:
+            return cached
+        
+        value = record.get(field)
+        return value.strip() if value else ''
+    
+    def _compare_snapshots(self, old_snapshot: Dict, new_snapshot: Dict,
+                           include_unchanged: bool = False) -> Dict[str, Any]:
         """
         Compara snapshots antes e depois para detectar mudanças.
         
+        Deve ser chamado antes de aplicar os novos dados, pois os registros removidos
+        (e os inalterados, se solicitados) são lidos de leads_data.
+        
         Args:
-            old_snapshot: Dados antes da sincronização
+            old_snapshot: Hashes dos dados antes da sincronização (ainda não aplicada)
             new_snapshot: Dados após a sincronização
+            include_unchanged: Se True, também materializa a lista de inalterados
             
         Returns:
-            Dict: Dicionário com listas de novos, removidos e inalterados
+            Dict: Listas de novos e removidos, contagem de inalterados e,
+                  se solicitada, a lista de inalterados
         """
-        # Detectar registros novos (existem no novo mas não no antigo)
-        new_records = []
-        for new_hash, new_data in new_snapshot.items():
-            if new_hash not in old_snapshot:
-                new_records.append(new_data)
-        
-        # Detectar registros removidos (existem no antigo mas não no novo)
-        removed_records = []
-        for old_hash, old_data in old_snapshot.items():
-            if old_hash not in new_snapshot:
-                removed_records.append(old_data)
-        
-        # Detectar registros inalterados (existem em ambos com mesmo hash)
-        unchanged_records = []
-        for old_hash, old_data in old_snapshot.items():
-            if old_hash in new_snapshot:
-                unchanged_records.append(old_data)
-        
-        self.logger.info(f"🔍 Mudanças detectadas: {len(new_records)} novos, {len(removed_records)} removidos, {len(unchanged_records)} inalterados")
-        
-        return {
+        # Diferença de conjuntos sobre as views de chaves (feita em C), sem laços por registro
+        old_keys = old_snapshot.keys()
+        new_keys = new_snapshot.keys()
+        
+        # Novos: existem no novo mas não no antigo; removidos: o inverso; inalterados: em ambos
+        new_records = [new_snapshot[h] for h in new_keys - old_keys]
+        removed_hashes = old_keys - new_keys
+        removed_records = self._fetch_snapshot_records(removed_hashes)
+        # A contagem de inalterados sai das outras duas, sem montar a interseção
+        unchanged_count = len(old_keys) - len(removed_hashes)
+        
+        self.logger.info(f"🔍 Mudanças detectadas: {len(new_records)} novos, {len(removed_records)} removidos, {unchanged_count} inalterados")
+        
+        changes = {
             'new': new_records,
             'removed': removed_records,
-            'unchanged': unchanged_records
+            'unchanged_count': unchanged_count
         }
+        # Em sincronizações estáveis quase tudo é inalterado: a lista só é montada se pedida
+        if include_unchanged:
+            changes['unchanged'] = self._fetch_snapshot_records(old_keys & new_keys)
+        
+        return changes
 
     def _log_bitrix_processing_record(self, record: Dict, status: str, action_type: str = None, 
                                        deal_id: int = None, contact_id: int = None, 
@@ -260,6 +432,9 @@ class SyncManager:
         """
         Registra um record processado na tabela bitrix_processing_log.
         
+        O registro é enfileirado no StartupModule e gravado em lote quando a
+        sessão de sincronização é finalizada (log_sync_end).
+        
         Args:
             record: Dados do record processado
             status: Status do processamento ('SUCCESS', 'FAILED', 'SKIPPED')
@@ -273,54 +448,124 @@ class SyncManager:
         try:
             from psycopg2.extras import Json
             
-            with self.startup.connection.cursor() as cursor:
-                # Converter data para o formato adequado
-                data_value = record.get('data')
-                parsed_date = None
-                if data_value:
-                    if isinstance(data_value, str) and data_value.strip():
-                        try:
-                            parsed_date = datetime.strptime(data_value.strip(), '%d/%m/%Y').date()
-                        except ValueError:
-                            try:
-                                parsed_date = datetime.strptime(data_value.strip(), '%Y-%m-%d').date()
-                            except ValueError:
-                                pass
-                
-                cursor.execute("""
-                    INSERT INTO bitrix_processing_log 
-                    (data, cnpj, telefone, nome, empresa, consultor, forma_prospeccao, etapa, banco,
-                     status, action_type, deal_id, contact_id, error_message, processing_details, sync_session_id)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                """, (
-                    parsed_date,
-                    record.get('cnpj'),
-                    record.get('telefone'),
-                    record.get('nome'),
-                    record.get('empresa'),
-                    record.get('consultor'),
-                    record.get('forma_prospeccao'),
-                    record.get('etapa'),
-                    record.get('banco'),
-                    status,
-                    action_type,
-                    deal_id,
-                    contact_id,
-                    error_message,
-                    Json(processing_details) if processing_details else None,
-                    sync_session_id
-                ))
+            # Converter data para o formato adequado: registros do snapshot já trazem
+            # a data convertida (date); texto no formato da planilha ou ISO ainda é aceito
+            data_value = record.get('data')
+            parsed_date = None
+            if isinstance(data_value, date):
+                parsed_date = data_value
+            elif isinstance(data_value, str) and data_value.strip():
+                parsed_date = parse_sheet_date(data_value)
+                if parsed_date is None:
+                    try:
+                        parsed_date = date.fromisoformat(data_value.strip())
+                    except ValueError:
+                        pass
+            
+            self.startup.queue_bitrix_processing_log((
+                parsed_date,
+                record.get('cnpj'),
+                record.get('telefone'),
+                record.get('nome'),
+                record.get('empresa'),
+                record.get('consultor'),
+                record.get('forma_prospeccao'),
+                record.get('etapa'),
+                record.get('banco'),
+                status,
+                action_type,
+                deal_id,
+                contact_id,
+                error_message,
+                Json(processing_details) if processing_details else None,
+                sync_session_id
+            ))
                 
         except Exception as e:
             self.logger.error(f"❌ Erro ao salvar log do processamento Bitrix: {str(e)}")
 
-    def _process_bitrix_updates(self, new_records: List[Dict], updated_records: List[Dict] = None) -> Dict[str, Any]:
+    def _prefetch_bitrix_deals(self, new_records: List[Dict]) -> Optional[Future]:
+        """
+        Inicia em segundo plano a busca dos deals existentes para os CNPJs que serão
+        enviados ao Bitrix, para que essa latência de rede corra junto com a escrita
+        em leads_data. A busca é somente leitura e não usa a conexão com o banco.
+        
+        A thread é exclusiva desta busca: o executor é encerrado logo após o envio
+        e a thread termina assim que a busca acaba (ou é cancelada).
+        
+        Args:
+            new_records: Lista de novos registros detectados
+            
+        Returns:
+            Optional[Future]: Busca em andamento (resultado de find_deals_by_cnpjs) ou
+                None se o Bitrix não estiver configurado ou não houver CNPJs
+        """
+        from bitrix_api import BitrixAPI
+        
+        webhook_url = os.getenv('BITRIX_URL')
+        cnpjs = [
+            self._normalized_field(record, 'cnpj')
+            for record in new_records[:BITRIX_MAX_RECORDS_PER_SYNC]
+        ]
+        if not webhook_url or not any(cnpjs):
+            return None
+        
+        executor = ThreadPoolExecutor(max_workers=1)
+        try:
+            return executor.submit(BitrixAPI(webhook_url).find_deals_by_cnpjs, cnpjs)
+        finally:
+            executor.shutdown(wait=False)
+    
+    @staticmethod
+    def _group_records_by_identity(records_to_send: List[tuple]) -> List[List[tuple]]:
+        """
+        Agrupa os registros que compartilham CNPJ ou telefone, direta ou indiretamente
+        (ex.: A e B com o mesmo CNPJ, B e C com o mesmo telefone: A, B e C juntos).
+        
+        O contato no Bitrix é buscado por telefone ou CNPJ e o deal por CNPJ, então só
+        registros de grupos diferentes podem ser enviados em paralelo com segurança.
+        
+        Args:
+            records_to_send: Tuplas (posição, registro, cnpj, telefone), com CNPJ e
+                telefone normalizados e pelo menos um dos dois preenchido
+            
+        Returns:
+            List[List[tuple]]: Grupos de (posição, registro, cnpj), na ordem original
+        """
+        parent = {}
+        
+        def find(key):
+            parent.setdefault(key, key)
+            while parent[key] != key:
+                parent[key] = parent[parent[key]]
+                key = parent[key]
+            return key
+        
+        record_keys = []
+        for i, record, cnpj, telefone in records_to_send:
+            keys = [key for key in (cnpj and f"cnpj:{cnpj}", telefone and f"tel:{telefone}") if key]
+            root = find(keys[0])
+            for key in keys[1:]:
+                other = find(key)
+                if other != root:
+                    parent[other] = root
+            record_keys.append(keys[0])
+        
+        groups = {}
+        for (i, record, cnpj, _), key in zip(records_to_send, record_keys):
+            groups.setdefault(find(key), []).append((i, record, cnpj))
+        return list(groups.values())
+    
+    def _process_bitrix_updates(self, new_records: List[Dict], updated_records: List[Dict] = None,
+                                deals_prefetch: Optional[Future] = None) -> Dict[str, Any]:
         """
         Processa novos registros e atualizações no Bitrix através da função create_or_update_deal.
         
         Args:
             new_records: Lista de novos registros detectados
             updated_records: Lista de registros atualizados (opcional)
+            deals_prefetch: Busca de deals iniciada por _prefetch_bitrix_deals (opcional).
+                Se None, a busca em lote é feita aqui
             
         Returns:
             Dict: Resultado do processamento com estatísticas e logs
@@ -379,93 +624,138 @@ class SyncManager:
             failed_records = []
             successful_records = []
             
-            self.logger.info(f"📊 Processando {len(all_records_to_process)} registros no Bitrix...")
+            total_records = len(all_records_to_process)
+            log_each_record = self.logger.isEnabledFor(logging.INFO)
+            self.logger.info("📊 Processando %d registros no Bitrix...", total_records)
             
-            for i, record in enumerate(all_records_to_process[:50], 1):
-                try:
-                    # Validar se o registro tem dados mínimos necessários
-                    cnpj = record.get('cnpj', '').strip() if record.get('cnpj') else ''
-                    telefone = record.get('telefone', '').strip() if record.get('telefone') else ''
-                    
-                    if not cnpj and not telefone:
-                        self.logger.warning(f"⚠️ Registro {i} pulado: sem CNPJ nem telefone")
-                        skipped += 1
-                        # Log do record pulado
-                        self._log_bitrix_processing_record(
-                            record, 'SKIPPED', 'skipped', 
-                            error_message='Sem CNPJ nem telefone',
-                            sync_session_id=bitrix_session_id
-                        )
-                        continue
-                    
-                    # Log do registro sendo processado
-                    empresa = record.get('empresa', '').strip() if record.get('empresa') else ''
-                    log_info = f"CNPJ: {cnpj or 'N/A'}, Telefone: {telefone or 'N/A'}, Empresa: {empresa or 'N/A'}"
-                    self.logger.info(f"🔄 Processando registro {i}/{len(all_records_to_process)}: {log_info}")
-                    
-                    # Chamar create_or_update_deal do Bitrix
-                    result = bitrix_api.create_or_update_deal(record)
-                    
-                    # Log do resultado
-                    action = result.get('action', 'unknown')
-                    deal_id = result.get('deal_id')
-                    contact_id = result.get('contact_id')
-                    message = result.get('message', 'Sem mensagem')
-                    
-                    if action in ['created', 'updated']:
-                        self.logger.info(f"✅ Deal {action}: ID {deal_id} - {message}")
-                        successful += 1
-                        successful_records.append({
-                            'record': record,
-                            'result': result,
-                            'action': action
-                        })
-                        
-                        # Log do sucesso na tabela
-                        self._log_bitrix_processing_record(
-                            record, 'SUCCESS', action,
-                            deal_id=deal_id,
-                            contact_id=contact_id,
-                            processing_details=result,
-                            sync_session_id=bitrix_session_id
-                        )
-                    else:
-                        self.logger.warning(f"⚠️ Resultado inesperado: {message}")
-                        failed += 1
-                        failed_records.append({
-                            'record': record,
-                            'error': f"Resultado inesperado: {message}"
-                        })
-                        
-                        # Log do erro na tabela
-                        self._log_bitrix_processing_record(
-                            record, 'FAILED', action,
-                            error_message=f"Resultado inesperado: {message}",
-                            processing_details=result,
-                            sync_session_id=bitrix_session_id
-                        )
-                    
-                    processed += 1
-                    
-                except Exception as e:
-                    error_msg = str(e)
-                    self.logger.error(f"❌ Erro ao processar registro {i}: {error_msg}")
-                    self.logger.error(f"   Dados do registro: {json.dumps(record, ensure_ascii=False)}")
-                    
-                    failed += 1
-                    failed_records.append({
-                        'record': record,
-                        'error': error_msg
-                    })
-                    
-                    # Log do erro na tabela
+            # Validação e log de cada registro antes do envio
+            records_to_send = []
+            for i, record in enumerate(all_records_to_process[:BITRIX_MAX_RECORDS_PER_SYNC], 1):
+                # Validar se o registro tem dados mínimos necessários
+                cnpj = self._normalized_field(record, 'cnpj')
+                telefone = self._normalized_field(record, 'telefone')
+                
+                if not cnpj and not telefone:
+                    self.logger.warning("⚠️ Registro %d pulado: sem CNPJ nem telefone", i)
+                    skipped += 1
+                    # Log do record pulado
                     self._log_bitrix_processing_record(
-                        record, 'FAILED', None,
-                        error_message=error_msg,
+                        record, 'SKIPPED', 'skipped', 
+                        error_message='Sem CNPJ nem telefone',
                         sync_session_id=bitrix_session_id
                     )
-                    
-                    processed += 1
+                    continue
+                
+                # Log do registro sendo processado (só montado se INFO estiver habilitado)
+                if log_each_record:
+                    empresa = self._normalized_field(record, 'empresa')
+                    self.logger.info("🔄 Processando registro %d/%d: CNPJ: %s, Telefone: %s, Empresa: %s",
+                                     i, total_records, cnpj or 'N/A', telefone or 'N/A', empresa or 'N/A')
+                records_to_send.append((i, record, cnpj, telefone))
+            
+            # Registros que compartilham CNPJ ou telefone ficam na mesma tarefa, em sequência,
+            # para que duas threads não criem o mesmo deal nem o mesmo contato ao mesmo tempo
+            record_groups = self._group_records_by_identity(records_to_send)
+            
+            # Deals existentes de todos os CNPJs em uma única requisição (método batch do Bitrix).
+            # Se a busca em lote falhar, cada registro faz a própria busca como antes.
+            try:
+                if deals_prefetch is not None:
+                    prefetched_deals = deals_prefetch.result()
+                else:
+                    prefetched_deals = bitrix_api.find_deals_by_cnpjs(
+                        [cnpj for _, _, cnpj, _ in records_to_send if cnpj]
+                    )
+            except Exception as e:
+                self.logger.warning(f"⚠️ Busca de deals em lote falhou, buscando por registro: {e}")
+                prefetched_deals = {}
+            
+            def send_group(group):
+                outcomes = []
+                seen_cnpjs = set()
+                for i, record, cnpj in group:
+                    # Só o primeiro registro de cada CNPJ usa a busca prévia: os seguintes
+                    # precisam enxergar o deal que ele possa ter acabado de criar
+                    existing_deals = prefetched_deals.get(cnpj) if cnpj and cnpj not in seen_cnpjs else None
+                    seen_cnpjs.add(cnpj)
+                    try:
+                        result = bitrix_api.create_or_update_deal(record, existing_deals=existing_deals)
+                        outcomes.append((i, record, result, None))
+                    except Exception as e:
+                        outcomes.append((i, record, None, e))
+                return outcomes
+            
+            # Chamadas ao Bitrix são limitadas pela latência de rede: enviadas em paralelo
+            with ThreadPoolExecutor(max_workers=BITRIX_MAX_WORKERS) as executor:
+                futures = [executor.submit(send_group, group) for group in record_groups]
+                
+                for future in as_completed(futures):
+                    for i, record, result, error in future.result():
+                        try:
+                            if error is not None:
+                                raise error
+                            
+                            # Log do resultado
+                            action = result.get('action', 'unknown')
+                            deal_id = result.get('deal_id')
+                            contact_id = result.get('contact_id')
+                            message = result.get('message', 'Sem mensagem')
+                            
+                            if action in ['created', 'updated']:
+                                if log_each_record:
+                                    self.logger.info("✅ Deal %s: ID %s - %s", action, deal_id, message)
+                                successful += 1
+                                successful_records.append({
+                                    'record': record,
+                                    'result': result,
+                                    'action': action
+                                })
+                                
+                                # Log do sucesso na tabela
+                                self._log_bitrix_processing_record(
+                                    record, 'SUCCESS', action,
+                                    deal_id=deal_id,
+                                    contact_id=contact_id,
+                                    processing_details=result,
+                                    sync_session_id=bitrix_session_id
+                                )
+                            else:
+                                self.logger.warning("⚠️ Resultado inesperado: %s", message)
+                                failed += 1
+                                failed_records.append({
+                                    'record': record,
+                                    'error': f"Resultado inesperado: {message}"
+                                })
+                                
+                                # Log do erro na tabela
+                                self._log_bitrix_processing_record(
+                                    record, 'FAILED', action,
+                                    error_message=f"Resultado inesperado: {message}",
+                                    processing_details=result,
+                                    sync_session_id=bitrix_session_id
+                                )
+                            
+                            processed += 1
+                            
+                        except Exception as e:
+                            error_msg = str(e)
+                            self.logger.error("❌ Erro ao processar registro %d: %s", i, error_msg)
+                            self.logger.error("   Dados do registro: %s", record)
+                            
+                            failed += 1
+                            failed_records.append({
+                                'record': record,
+                                'error': error_msg
+                            })
+                            
+                            # Log do erro na tabela
+                            self._log_bitrix_processing_record(
+                                record, 'FAILED', None,
+                                error_message=error_msg,
+                                sync_session_id=bitrix_session_id
+                            )
+                            
+                            processed += 1
             
             # Finalizar log da sessão
             self.startup.log_sync_end(
@@ -560,48 +850,40 @@ class SyncManager:
         try:
             self.logger.info(f"🔍 VALIDAÇÃO CRÍTICA: Verificando dados de {len(sheet_ids)} abas ANTES de qualquer alteração no banco...")
             
-            # Tentar buscar dados de TODAS as abas primeiro
+            # Buscar dados de TODAS as abas em paralelo (chamadas de rede independentes),
+            # com a mesma busca/validação por aba usada pelo startup
+            fetched_sheets = {}
+            with ThreadPoolExecutor(max_workers=max(1, min(SHEETS_MAX_WORKERS, len(sheet_ids)))) as executor:
+                futures = {
+                    executor.submit(self.startup._fetch_sheet_for_validation, spreadsheet_id, sheet_id): sheet_id
+                    for sheet_id in sheet_ids
+                }
+                
+                for future in as_completed(futures):
+                    sheet_id = futures[future]
+                    try:
+                        fetched_sheets[sheet_id] = future.result()
+                        
+                    except Exception as sheet_error:
+                        error_msg = f"Erro ao buscar dados da aba ID {sheet_id}: {sheet_error}"
+                        self.logger.error(f"❌ {error_msg}")
+                        
+                        validation_result['failed_sheets'].append({
+                            'sheet_id': sheet_id,
+                            'error': str(sheet_error)
+                        })
+                        
+                        # SE QUALQUER ABA FALHAR, PARAR IMEDIATAMENTE (cancelando as buscas pendentes)
+                        for pending in futures:
+                            pending.cancel()
+                        validation_result['error_message'] = error_msg
+                        raise Exception(error_msg)
+            
+            # Armazenar dados na mesma ordem em que as abas foram solicitadas
             for sheet_id in sheet_ids:
-                try:
-                    self.logger.info(f"📊 Validando aba ID: {sheet_id}")
-                    
-                    # Tentar obter dados da aba - SE FALHAR AQUI, PARAR TUDO
-                    sheet_data = self.startup.google_sheets.get_sheet_data_as_json(
-                        spreadsheet_id, 
-                        sheet_id
-                    )
-                    
-                    sheet_name = sheet_data['sheet_info']['sheet_name']
-                    rows_data = sheet_data['data']
-                    
-                    # Validar se a aba tem estrutura mínima esperada
-                    if 'sheet_info' not in sheet_data or 'data' not in sheet_data:
-                        raise Exception(f"Estrutura de dados inválida retornada pela aba '{sheet_name}'")
-                    
-                    # Armazenar dados da aba
-                    validation_result['sheets_data'][sheet_id] = {
-                        'sheet_name': sheet_name,
-                        'data': rows_data,
-                        'total_rows': len(rows_data),
-                        'sheet_info': sheet_data['sheet_info']
-                    }
-                    
-                    validation_result['total_records'] += len(rows_data)
-                    
-                    self.logger.info(f"✅ Aba '{sheet_name}' validada: {len(rows_data)} registros")
-                    
-                except Exception as sheet_error:
-                    error_msg = f"Erro ao buscar dados da aba ID {sheet_id}: {str(sheet_error)}"
-                    self.logger.error(f"❌ {error_msg}")
-                    
-                    validation_result['failed_sheets'].append({
-                        'sheet_id': sheet_id,
-                        'error': str(sheet_error)
-                    })
-                    
-                    # SE QUALQUER ABA FALHAR, PARAR IMEDIATAMENTE
-                    validation_result['error_message'] = error_msg
-                    raise Exception(error_msg)
+                validated_sheet = fetched_sheets[sheet_id]
+                validation_result['sheets_data'][sheet_id] = validated_sheet
+                validation_result['total_records'] += validated_sheet['total_rows']
             
             # Se chegou aqui, todas as abas foram validadas com sucesso
             validation_result['success'] = True
@@ -616,7 +898,8 @@ class SyncManager:
             self.logger.error("🚫 SINCRONIZAÇÃO CANCELADA - dados das planilhas não puderam ser obtidos")
             raise e
 
-    def clear_and_resync_database(self, spreadsheet_id: str, sheet_ids: List[int]) -> SyncResult:
+    def clear_and_resync_database(self, spreadsheet_id: str, sheet_ids: List[int],
+                                  include_unchanged: bool = False) -> SyncResult:
         """
         Método principal para sincronização por limpeza total e reinserção com detecção de mudanças.
         
@@ -626,20 +909,21 @@ class SyncManager:
         Este método:
         1. PRIMEIRO: Valida todas as abas das planilhas
         2. Captura snapshot dos dados atuais
-        3. Remove todos os dados da tabela leads_data
-        4. Carrega dados frescos de todas as abas especificadas (dados já validados)
-        5. Insere todos os dados no banco
-        6. Compara antes/depois para detectar mudanças
-        7. Retorna relatório detalhado das diferenças
+        3. Carrega dados frescos de todas as abas especificadas (dados já validados)
+        4. Compara antes/depois para detectar mudanças
+        5. Aplica em leads_data só as linhas que mudaram (numa única transação)
+        6. Retorna relatório detalhado das diferenças
         
         Args:
             spreadsheet_id (str): ID da planilha do Google Sheets
             sheet_ids (List[int]): Lista de IDs das abas para sincronizar
+            include_unchanged (bool): Se True, preenche result.unchanged_records (lido
+                do banco); por padrão só a contagem de inalterados é calculada
             
         Returns:
             SyncResult: Resultado detalhado da sincronização com mudanças detectadas
         """
-        start_time = datetime.now()
+        start_time = time.perf_counter()
         self.logger.info("🔄 Iniciando sincronização com validação e detecção de mudanças...")
         
         # Registrar início da sincronização
@@ -650,6 +934,7 @@ class SyncManager:
         )
         
         result = SyncResult()
+        deals_prefetch = None
         
         try:
             # 1. PRIMEIRO: VALIDAR TODAS as abas ANTES de fazer qualquer alteração no banco
@@ -662,7 +947,7 @@ class SyncManager:
                 self.logger.error("🚫 Sincronização CANCELADA por falha na validação das planilhas")
                 
                 result.error_message = f"Validação falhou: {str(validation_error)}"
-                result.sync_duration = (datetime.now() - start_time).total_seconds()
+                result.sync_duration = time.perf_counter() - start_time
                 
                 self.startup.log_sync_end(log_id, status='ERROR', error_message=result.error_message)
                 return result
@@ -672,7 +957,7 @@ class SyncManager:
                 self.logger.error("🚫 Sincronização CANCELADA")
                 
                 result.error_message = validation_result['error_message']
-                result.sync_duration = (datetime.now() - start_time).total_seconds()
+                result.sync_duration = time.perf_counter() - start_time
                 
                 self.startup.log_sync_end(log_id, status='ERROR', error_message=result.error_message)
                 return result
@@ -684,15 +969,8 @@ class SyncManager:
             self.logger.info("📸 Capturando snapshot dos dados atuais...")
             old_snapshot = self._capture_current_snapshot()
             
-            # 3. AGORA é seguro limpar o banco (dados já validados)
-            self.logger.info("🗑️ Limpando tabela leads_data (dados validados, operação segura)...")
-            with self.startup.connection.cursor() as cursor:
-                cursor.execute("DELETE FROM leads_data;")
-                self.logger.info("✅ Tabela leads_data limpa com sucesso")
-            
-            # 4. Processar cada aba usando os dados já validados
+            # 3. Processar cada aba usando os dados já validados
             all_insert_values = []
-            sheet_names = []
             
             for sheet_id in sheet_ids:
                 try:
@@ -706,18 +984,14 @@ class SyncManager:
                     # Processar cada linha da aba
                     processed_count = 0
                     failed_count = 0
+                    invalid_dates = []
+                    get_fields = sheet_row_getter(rows_data)
                     
                     for row in rows_data:
                         try:
                             # Mapear campos do Google Sheets para campos da tabela
-                            data_value = row.get('Data', row.get('data', ''))
-                            cnpj_value = row.get('CNPJ', row.get('cnpj', ''))
-                            telefone_value = row.get('TELEFONE', row.get('telefone', ''))
-                            nome_value = row.get('NOME', row.get('nome', ''))
-                            empresa_value = row.get('EMPRESA', row.get('empresa', ''))
-                            consultor_value = row.get('CONSULTOR', row.get('consultor', ''))
-                            forma_prospeccao_value = row.get('Forma Prospecção', row.get('forma_prospeccao', ''))
-                            etapa_value = row.get('Etapa', row.get('etapa', ''))
+                            (data_value, cnpj_value, telefone_value, nome_value, empresa_value,
+                             consultor_value, forma_prospeccao_value, etapa_value) = get_fields(row)
                             
                             # Validar se tem CNPJ OU TELEFONE (pelo menos um dos dois)
                             has_cnpj = cnpj_value and cnpj_value.strip()
@@ -726,16 +1000,14 @@ class SyncManager:
                             if not (has_cnpj or has_telefone):
                                 continue  # Pular se não tem nem CNPJ nem telefone
                                 
-                            # Converter data para o formato adequado
-                            parsed_date = None
-                            if data_value and isinstance(data_value, str) and data_value.strip():
-                                try:
-                                    parsed_date = datetime.strptime(data_value.strip(), '%d/%m/%Y').date()
-                                except ValueError:
-                                    self.logger.warning(f"⚠️ Formato de data inválido: {data_value}")
+                            # Converter data para o formato adequado (None se vazia ou inválida)
+                            parsed_date = parse_sheet_date(data_value)
+                            if parsed_date is None and data_value and isinstance(data_value, str) and data_value.strip():
+                                invalid_dates.append(data_value)
                             
-                            # Adicionar valores à lista para inserção
-                            all_insert_values.append((
+                            # Adicionar valores à lista para inserção, já com os hashes usados
+                            # no snapshot, no delta e na gravação
+                            all_insert_values.append(leads_load_row((
                                 parsed_date,
                                 cnpj_value or None,
                                 telefone_value or None,
@@ -745,15 +1017,15 @@ class SyncManager:
                                 forma_prospeccao_value or None,
                                 etapa_value or None,
                                 sheet_name  # Usar nome da aba como "Banco"
-                            ))
-                            
-                            sheet_names.append(sheet_name)
+                            )))
                             processed_count += 1
                             
                         except Exception as row_error:
                             failed_count += 1
                             self.logger.warning(f"⚠️ Erro ao processar registro da aba '{sheet_name}': {str(row_error)}")
                     
+                    self.startup.log_invalid_dates(sheet_name, invalid_dates)
+                    
                     # Registrar estatísticas da aba
                     result.sheets_data[sheet_name] = {
                         'total_rows': len(rows_data),
@@ -771,51 +1043,71 @@ class SyncManager:
                     self.logger.error(f"❌ Erro interno ao processar aba ID {sheet_id}: {str(sheet_error)}")
                     result.failed_records += 1
             
-            # 5. Criar snapshot dos novos dados
+            # 4. Criar snapshot dos novos dados
             self.logger.info("📸 Criando snapshot dos novos dados...")
-            new_snapshot = self._create_new_data_snapshot(all_insert_values, sheet_names)
+            new_snapshot = self._create_new_data_snapshot(all_insert_values)
             
-            # 6. Inserir todos os dados coletados no banco
-            if all_insert_values:
-                self.logger.info(f"💾 Inserindo {len(all_insert_values)} registros no banco...")
-                
-                with self.startup.connection.cursor() as cursor:
-                    insert_sql = """
-                    INSERT INTO leads_data 
-                    (data, cnpj, telefone, nome, empresa, consultor, forma_prospeccao, etapa, banco)
-                    VALUES %s
-                    """
-                    
-                    # Executar inserção em massa
-                    execute_values(cursor, insert_sql, all_insert_values)
-                    result.total_inserted = len(all_insert_values)
-                
-                self.logger.info(f"✅ {result.total_inserted} registros inseridos com sucesso")
-            else:
-                self.logger.warning("⚠️ Nenhum registro válido encontrado para inserir")
-            
-            # 7. Comparar snapshots para detectar mudanças
+            # 5. Comparar snapshots para detectar mudanças (antes de alterar o banco, pois os
+            #    registros removidos são lidos de leads_data)
             self.logger.info("🔍 Detectando mudanças...")
-            changes = self._compare_snapshots(old_snapshot, new_snapshot)
+            changes = self._compare_snapshots(old_snapshot, new_snapshot, include_unchanged)
             
             # Atribuir mudanças ao resultado
             result.new_records = changes['new']
             result.removed_records = changes['removed']
-            result.unchanged_records = changes['unchanged']
+            result.unchanged_count = changes['unchanged_count']
+            result.unchanged_records = changes.get('unchanged')
             
             # Resumo das mudanças
             result.changes_detected = {
                 'total_new': len(result.new_records),
                 'total_removed': len(result.removed_records),
-                'total_unchanged': len(result.unchanged_records),
-                'summary': f"{len(result.new_records)} novos, {len(result.removed_records)} removidos, {len(result.unchanged_records)} inalterados"
+                'total_unchanged': result.unchanged_count,
+                'summary': f"{len(result.new_records)} novos, {len(result.removed_records)} removidos, {result.unchanged_count} inalterados"
             }
             
-            # 8. Calcular estatísticas finais
-            end_time = datetime.now()
-            result.sync_duration = (end_time - start_time).total_seconds()
+            # A busca de deals no Bitrix (somente leitura) já começa, enquanto o banco é atualizado
+            deals_prefetch = self._prefetch_bitrix_deals(result.new_records)
+            
+            # 6. AGORA é seguro atualizar os dados (já validados): só a diferença entre planilhas
+            #    e banco é aplicada, numa única transação, de modo que os dados antigos
+            #    permanecem se a carga falhar
+            self.logger.info(f"💾 Sincronizando leads_data com {len(all_insert_values)} registros...")
+            with self._transaction() as cursor:
+                # Commit sem esperar o flush do WAL: numa queda, no máximo esta carga se perde
+                # (sem corromper a tabela) e a próxima sincronização a refaz. SET LOCAL expira
+                # no COMMIT e não vaza para a sessão.
+                cursor.execute("SET LOCAL synchronous_commit TO OFF;")
+                delta = self._apply_leads_delta(cursor, all_insert_values)
+                
+                # Versão já contando as escritas desta transação
+                cursor.execute(LEADS_DATA_VERSION_SQL)
+                version = cursor.fetchone()['version']
+            result.total_inserted = delta['inserted']
+            
+            # Após uma carga completa, estatísticas e mapa de visibilidade atualizados já:
+            # as leituras por hash (snapshot e delta) passam a usar index-only scan
+            if delta['inserted'] and not delta['kept']:
+                self.startup.analyze_leads_data()
+            
+            # Após o COMMIT leads_data corresponde ao snapshot novo, que vira o snapshot
+            # "antes" da próxima sincronização enquanto a versão não mudar
+            snapshot_counts = {h: record['_count'] for h, record in new_snapshot.items()}
+            if sum(snapshot_counts.values()) == len(all_insert_values):
+                self._snapshot_cache = (version, snapshot_counts)
+            else:
+                self._snapshot_cache = None
+            
+            if all_insert_values:
+                self.logger.info(f"✅ leads_data atualizada: {delta['inserted']} inseridos, "
+                                 f"{delta['deleted']} removidos, {delta['kept']} mantidos")
+            else:
+                self.logger.warning("⚠️ Nenhum registro válido encontrado para inserir")
             
-            # 9. Registrar fim da sincronização
+            # 7. Calcular estatísticas finais
+            result.sync_duration = time.perf_counter() - start_time
+            
+            # 8. Registrar fim da sincronização
             self.startup.log_sync_end(
                 log_id,
                 processed=result.total_processed,
@@ -829,11 +1121,11 @@ class SyncManager:
             self.logger.info(f"📊 Resumo: {result.total_processed} processados, {result.total_inserted} inseridos, {result.failed_records} falharam")
             self.logger.info(f"🔍 Mudanças: {result.changes_detected['summary']}")
             
-            # 10. Processar atualizações no Bitrix
+            # 9. Processar atualizações no Bitrix
             if result.new_records:
                 self.logger.info("🎯 Processando novos registros no Bitrix...")
                 
-                bitrix_result = self._process_bitrix_updates(result.new_records)
+                bitrix_result = self._process_bitrix_updates(result.new_records, deals_prefetch=deals_prefetch)
                 
                 # Adicionar resultado do Bitrix ao resultado da sincronização
                 result.bitrix_processing = bitrix_result
@@ -860,9 +1152,12 @@ class SyncManager:
             result.error_message = error_msg
             self.logger.error(f"❌ {error_msg}")
             
+            # A busca antecipada de deals não será usada: cancelada se ainda não começou
+            if deals_prefetch is not None:
+                deals_prefetch.cancel()
+            
             # Calcular duração mesmo em caso de erro
-            end_time = datetime.now()
-            result.sync_duration = (end_time - start_time).total_seconds()
+            result.sync_duration = time.perf_counter() - start_time
             
             self.startup.log_sync_end(log_id, status='ERROR', error_message=error_msg)
             return result
@@ -876,45 +1171,28 @@ class SyncManager:
         """
         try:
             with self.startup.connection.cursor() as cursor:
-                # Total de registros
-                cursor.execute("SELECT COUNT(*) as total FROM leads_data;")
-                total_records = cursor.fetchone()['total']
+                # Total, registros por banco (aba) e por consultor e últimas atualizações
+                # numa única varredura de leads_data
+                cursor.execute(DATA_SUMMARY_SQL)
                 
-                # Registros por banco (aba)
-                cursor.execute("""
-                    SELECT banco, COUNT(*) as count 
-                    FROM leads_data 
-                    WHERE banco IS NOT NULL
-                    GROUP BY banco 
-                    ORDER BY count DESC;
-                """)
-                by_banco = cursor.fetchall()
-                
-                # Registros por consultor
-                cursor.execute("""
-                    SELECT consultor, COUNT(*) as count 
-                    FROM leads_data 
-                    WHERE consultor IS NOT NULL AND consultor != ''
-                    GROUP BY consultor 
-                    ORDER BY count DESC 
-                    LIMIT 10;
-                """)
-                by_consultor = cursor.fetchall()
-                
-                # Últimas atualizações
-                cursor.execute("""
-                    SELECT MAX(created_at) as last_insert,
-                           MAX(updated_at) as last_update
-                    FROM leads_data;
-                """)
-                timestamps = cursor.fetchone()
+                totals = None
+                by_banco = []
+                by_consultor = []
+                for row in cursor:
+                    if row['grouping_set'] == SUMMARY_TOTALS:
+                        totals = row
+                    elif row['grouping_set'] == SUMMARY_BY_BANCO:
+                        if row['banco'] is not None:
+                            by_banco.append({'banco': row['banco'], 'count': row['count']})
+                    elif row['consultor']:
+                        by_consultor.append({'consultor': row['consultor'], 'count': row['count']})
                 
                 return {
-                    'total_records': total_records,
-                    'records_by_banco': [dict(r) for r in by_banco],
-                    'records_by_consultor': [dict(r) for r in by_consultor],
-                    'last_insert': timestamps['last_insert'],
-                    'last_update': timestamps['last_update']
+                    'total_records': totals['count'],
+                    'records_by_banco': by_banco,
+                    'records_by_consultor': by_consultor[:10],
+                    'last_insert': totals['last_insert'],
+                    'last_update': totals['last_update']
                 }
                 
         except Exception as e:
@@ -932,8 +1210,6 @@ class SyncManager:
             Dict: Estatísticas detalhadas das sincronizações
         """
         try:
-            cutoff_time = datetime.now() - timedelta(hours=hours_back)
-            
             with self.startup.connection.cursor() as cursor:
                 cursor.execute("""
                     SELECT 
@@ -942,13 +1218,13 @@ class SyncManager:
                         SUM(records_inserted) as total_inserted,
                         SUM(records_failed) as total_failed,
                         AVG(EXTRACT(EPOCH FROM (finished_at - started_at))) as avg_duration,
-                        COUNT(CASE WHEN status = 'SUCCESS' THEN 1 END) as successful_syncs,
-                        COUNT(CASE WHEN status = 'ERROR' THEN 1 END) as failed_syncs,
+                        COUNT(*) FILTER (WHERE status = 'SUCCESS') as successful_syncs,
+                        COUNT(*) FILTER (WHERE status = 'ERROR') as failed_syncs,
                         MAX(finished_at) as last_sync
                     FROM sync_log 
-                    WHERE started_at >= %s 
-                    AND sync_type IN ('clear_and_resync', 'sheets_to_db');
-                """, (cutoff_time,))
+                    WHERE started_at >= NOW() - make_interval(hours => %s)
+                    AND sync_type = ANY(%s);
+                """, (hours_back, list(SYNC_STATISTICS_TYPES)))
                 
                 stats = cursor.fetchone()
                 
@@ -1009,9 +1285,8 @@ def main():
         # 3. Configurar parâmetros de sincronização
         spreadsheet_id = os.getenv('SPREADSHEET_ID')
         
-        # Obter IDs das abas via variável de ambiente
-        sheet_ids_str = os.getenv('SHEET_IDS', '0,829477907,797561708,1064048522')
-        sheet_ids = [int(id.strip()) for id in sheet_ids_str.split(',')]
+        # IDs das abas já validados ao carregar o ambiente
+        sheet_ids = list(startup.sheet_ids)
         
         if not spreadsheet_id:
             print("❌ SPREADSHEET_ID não configurado no arquivo .env")
@@ -1031,9 +1306,9 @@ def main():
         
         # 6. Exibir mudanças detectadas
         print(f"\n🔍 Mudanças Detectadas:")
-        print(f"   ➕ Novos registros: {len(result.new_records)}")
-        print(f"   🗑️ Registros removidos: {len(result.removed_records)}")
-        print(f"   ✔️ Registros inalterados: {len(result.unchanged_records)}")
+        print(f"   ➕ Novos registros: {len(result.new_records or [])}")
+        print(f"   🗑️ Registros removidos: {len(result.removed_records or [])}")
+        print(f"   ✔️ Registros inalterados: {result.unchanged_count}")
         
         # 7. Mostrar exemplos dos novos registros (primeiros 3)
         if result.new_records:
@@ -1089,7 +1364,7 @@ def main():
         print(f"\n💡 Você pode acessar as mudanças através de:")
         print(f"   - result.new_records (lista dos novos registros)")
         print(f"   - result.removed_records (lista dos registros removidos)")
-        print(f"   - result.unchanged_records (lista dos registros inalterados)")
+        print(f"   - result.unchanged_count (quantidade de registros inalterados)")
         
     except Exception as e:
         print(f"❌ Erro no gerenciador de sincronização: {str(e)}")